@@ -1,7 +1,7 @@
-import sys,telethon,inspect,re,os,configparser,asyncio,logging,argparse
+import sys,re,os,asyncio,logging,argparse,json,zlib,subprocess,threading,shutil,signal
+from collections import deque
+from contextlib import AsyncExitStack
 from decouple import config
-from youtube_transcript_api import YouTubeTranscriptApi, NoTranscriptFound, TranscriptsDisabled
-import yt_dlp
 from datetime import datetime, timedelta, timezone
 from telethon import TelegramClient
 from telethon.errors import (
@@ -12,14 +12,10 @@ from telethon.errors import (
 # CRITICAL: Import these for URL entities
 from telethon.tl.types import MessageEntityTextUrl, MessageEntityUrl
 from telethon.network.connection.tcpfull import ConnectionTcpFull
-import io
+from hashtag_index import index_chat_text
 
-# Ensure stdout uses UTF-8 encoding
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
-print(f"Scraper is using Python executable: {sys.executable}")
-print(f"Telethon version in scraper: {telethon.__version__}")
-print(f"Telethon module path: {telethon.__file__}")
-print(inspect.signature(telethon.client.messages.MessageMethods.iter_messages))
+# NOTE: yt_dlp and youtube_transcript_api are imported inside
+# save_youtube_transcript_to_file, so runs without "Links" never load them.
 
 # Determine the base directory
 if getattr(sys, 'frozen', False):
@@ -34,9 +30,6 @@ logging.basicConfig(
     stream=sys.stdout,
 )
 
-api_id = config("api_id")
-api_hash = config("api_hash")
-
 # Safe decode
 def safe_decode(text):
     if not text:
@@ -117,25 +110,181 @@ def get_link_context(message, url, max_chars=180):
 
     return context.replace("\n", " ").strip()
 
+# Pick the data type, target folder and extension for a media message (None if not wanted)
+def get_media_target(message, selected_folders, datatype_filter):
+    if message.photo and "Images" in datatype_filter:
+        return "Images", selected_folders["Images"], "jpg"
+    if message.video and "Videos" in datatype_filter:
+        return "Videos", selected_folders["Videos"], "mp4"
+    if (message.audio or message.voice or message.video_note) and "Audios" in datatype_filter:
+        ext = "ogg" if message.voice else "mp3" if message.audio else "mp4"
+        return "Audios", selected_folders["Audios"], ext
+    return None
+
+# === DOWNLOAD POLICY (thumbnail-only types, per-file size caps, per-run byte budget) ===
+download_policy = {
+    "thumbnail_only": set(),   # data types that only get a preview thumbnail
+    "max_file_bytes": {},      # data type -> max size of a single file
+    "byte_budget": None,       # max bytes downloaded in this run (None = unlimited)
+    "deferred_manifest": None, # where media over a cap is recorded for a later run
+}
+bytes_spent = 0
+
+def parse_size_caps(text):
+    """'Videos=200,Audios=50' (MB) -> {'Videos': 209715200, 'Audios': 52428800}"""
+    caps = {}
+    for item in (text or "").split(","):
+        if "=" not in item:
+            continue
+        data_type, mb = item.split("=", 1)
+        try:
+            caps[data_type.strip()] = int(float(mb) * 1024 * 1024)
+        except ValueError:
+            logging.error(f"Invalid size cap: {item}")
+    return caps
+
+def get_media_size(message):
+    return (message.file.size if message.file else None) or 0
+
+def has_thumbnail(message):
+    if message.photo:
+        return len(message.photo.sizes) > 1
+    return bool(message.document and message.document.thumbs)
+
+def get_download_mode(message, data_type):
+    """Returns 'full', 'thumbnail' or 'defer' for a media message."""
+    if data_type in download_policy["thumbnail_only"] and has_thumbnail(message):
+        return "thumbnail"
+    size = get_media_size(message)
+    cap = download_policy["max_file_bytes"].get(data_type)
+    if cap and size > cap:
+        return "defer"
+    budget = download_policy["byte_budget"]
+    if budget is not None and bytes_spent + size > budget:
+        return "defer"
+    return "full"
+
+def defer_media(message, media_path, data_type, reason):
+    manifest_path = download_policy["deferred_manifest"]
+    if not manifest_path:
+        return
+    append_manifest_entry(manifest_path, {
+        "chat": os.path.basename(os.path.dirname(os.path.dirname(media_path))),
+        "message_id": message.id,
+        "data_type": data_type,
+        "path": media_path,
+        "size": get_media_size(message),
+        "reason": reason,
+        "deferred_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+    })
+    logging.info(f"Deferred message {message.id} ({reason}, {get_media_size(message)} bytes)")
+
+# === RESUMABLE DOWNLOADS ===
+# Media is written to "<file>.part" with its progress in "<file>.part.json" and only
+# renamed to the final name once complete, so a killed run never leaves a file that
+# looks finished. Offsets stay on chunk boundaries (Telegram needs aligned requests).
+DOWNLOAD_CHUNK_SIZE = 512 * 1024
+
+def is_download_complete(message, media_path):
+    if not os.path.exists(media_path):
+        return False
+    expected = get_media_size(message) if message.document else 0
+    return not expected or os.path.getsize(media_path) >= expected
+
+def read_resume_offset(part_path, meta_path, message, expected_size):
+    if not os.path.exists(part_path):
+        return 0
+    offset = os.path.getsize(part_path)
+    if os.path.exists(meta_path):
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("message_id") != message.id or meta.get("size") != expected_size:
+                return 0  # Different media behind the same name, start over
+            offset = min(offset, meta.get("offset", 0))
+        except (OSError, ValueError):
+            pass
+    return offset - offset % DOWNLOAD_CHUNK_SIZE
+
+def write_resume_meta(meta_path, message, expected_size, offset):
+    tmp_path = meta_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"message_id": message.id, "size": expected_size, "offset": offset}, f)
+    os.replace(tmp_path, meta_path)
+
+async def download_to_path(client, message, media_path, thumb=None):
+    global bytes_spent
+    part_path = media_path + ".part"
+    meta_path = part_path + ".json"
+
+    if message.document and thumb is None:
+        expected_size = get_media_size(message)
+        # A file left behind by an older, non-resumable run is just an unfinished part
+        if os.path.exists(media_path) and not is_download_complete(message, media_path):
+            os.replace(media_path, part_path)
+        offset = start_offset = read_resume_offset(part_path, meta_path, message, expected_size)
+        if offset:
+            logging.info(f"Resuming message {message.id} at {offset}/{expected_size} bytes")
+
+        with open(part_path, "r+b" if os.path.exists(part_path) else "wb") as f:
+            f.truncate(offset)
+            f.seek(offset)
+            async for chunk in client.iter_download(
+                message.document,
+                offset=offset,
+                request_size=DOWNLOAD_CHUNK_SIZE,
+                file_size=expected_size,
+            ):
+                f.write(chunk)
+                offset += len(chunk)
+                f.flush()
+                write_resume_meta(meta_path, message, expected_size, offset)
+        transferred = offset - start_offset
+    else:
+        # Photos and thumbnails are small: no resume, but still never a half-written final file
+        await client.download_media(message, file=part_path, thumb=thumb)
+        transferred = os.path.getsize(part_path)
+
+    os.replace(part_path, media_path)
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+    bytes_spent += transferred
+    print(f"BYTES_DOWNLOADED:{transferred}")
+    # Lets a transcriber started with --stdin_events pick the file up right away
+    print(f"FILE_DONE:{os.path.abspath(media_path)}", flush=True)
+    return media_path
+
+async def download_with_policy(client, message, media_path, data_type):
+    """Applies the download policy; returns the written path or None when deferred."""
+    mode = get_download_mode(message, data_type) if data_type else "full"
+    if mode == "defer":
+        cap = download_policy["max_file_bytes"].get(data_type)
+        reason = "size_cap" if cap and get_media_size(message) > cap else "byte_budget"
+        defer_media(message, media_path, data_type, reason)
+        return None
+    if mode == "thumbnail":
+        thumb_path = os.path.splitext(media_path)[0] + "_thumb.jpg"
+        if os.path.exists(thumb_path):
+            return thumb_path
+        # Second-largest photo size, or the largest preview of a document
+        thumb = len(message.photo.sizes) - 2 if message.photo else -1
+        return await download_to_path(client, message, thumb_path, thumb=thumb)
+    return await download_to_path(client, message, media_path)
+
 # Handle media
-async def handle_media(client, message, media_folder, media_type):
+async def handle_media(client, message, media_folder, media_type, data_type=None):
     media_filename = f"{message.id}.{media_type}"
     media_path = os.path.join(media_folder, media_filename)
-    if not os.path.exists(media_path):
+    if not is_download_complete(message, media_path):
         try:
-            await client.download_media(message, file=media_path)
-            file_size = os.path.getsize(media_path)
-            print(f"BYTES_DOWNLOADED:{file_size}")
+            return await download_with_policy(client, message, media_path, data_type)
         except FileReferenceExpiredError:
             try:
                 # 🔄 Refresh the message (gets new file reference)
                 message = await client.get_messages(message.chat_id, ids=message.id)
 
                 # Retry download
-                await client.download_media(message, file=media_path)
-                file_size = os.path.getsize(media_path)
-                print(f"BYTES_DOWNLOADED:{file_size}")
-                return media_path
+                return await download_with_policy(client, message, media_path, data_type)
 
             except Exception as e:
                 logging.error(f"[Refetch Failed] message {message.id}: {e}")
@@ -145,6 +294,119 @@ async def handle_media(client, message, media_folder, media_type):
             return None
     return media_path
 
+# Append one JSON line to a manifest file
+def append_manifest_entry(manifest_path, entry):
+    with open(manifest_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+# === ALBUMS (grouped_id) ===
+async def handle_album(client, album, selected_folders, datatype_filter, manifest_path):
+    """
+    Downloads all members of an album as one unit.
+    Expired file references are refreshed with a single batched get_messages call.
+    """
+    files = {}
+    expired = []
+    for message in album:
+        data_type, folder, ext = get_media_target(message, selected_folders, datatype_filter)
+        media_path = os.path.join(folder, f"{message.id}.{ext}")
+        if is_download_complete(message, media_path):
+            files[message.id] = media_path
+            continue
+        try:
+            written = await download_with_policy(client, message, media_path, data_type)
+            if written:
+                files[message.id] = written
+        except FileReferenceExpiredError:
+            expired.append((message, media_path, data_type))
+        except Exception as e:
+            logging.error(f"Download failed for album message {message.id}: {e}")
+
+    if expired:
+        # 🔄 One round trip refreshes every expired member of the album
+        try:
+            refreshed = await client.get_messages(album[0].chat_id, ids=[m.id for m, _, _ in expired])
+        except Exception as e:
+            logging.error(f"[Refetch Failed] album {album[0].grouped_id}: {e}")
+            refreshed = []
+        for fresh, (message, media_path, data_type) in zip(refreshed, expired):
+            if fresh is None:
+                logging.error(f"[Refetch Failed] message {message.id} no longer available")
+                continue
+            try:
+                written = await download_with_policy(client, fresh, media_path, data_type)
+                if written:
+                    files[message.id] = written
+            except Exception as e:
+                logging.error(f"Download failed for album message {message.id}: {e}")
+
+    caption = next((m.message for m in album if m.message), "")
+    append_manifest_entry(manifest_path, {
+        "grouped_id": album[0].grouped_id,
+        "date": album[0].date.strftime('%Y-%m-%d %H:%M:%S'),
+        "sender_id": album[0].sender_id,
+        "message_ids": sorted(m.id for m in album),
+        "files": [os.path.basename(files[m.id]) for m in album if m.id in files],
+        "caption": safe_decode(caption),
+    })
+    return files
+
+# === DEFERRED MEDIA (low-priority run) ===
+async def fetch_deferred_media(client, manifest_path):
+    """
+    Downloads media recorded in the deferred manifest, ignoring per-file caps.
+    Entries that still don't fit the byte budget (or fail) stay in the manifest.
+    """
+    if not os.path.exists(manifest_path):
+        logging.info(f"No deferred manifest at {manifest_path}")
+        return
+
+    entries = {}
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                entries[entry["path"]] = entry  # re-deferred media keeps one entry
+
+    by_chat = {}
+    for entry in entries.values():
+        if not os.path.exists(entry["path"]):
+            by_chat.setdefault(entry["chat"], []).append(entry)
+
+    remaining = []
+    budget = download_policy["byte_budget"]
+    for chat, chat_entries in by_chat.items():
+        try:
+            entity = await client.get_entity(chat)
+        except Exception as e:
+            logging.error(f"Failed to resolve {chat} for deferred media: {e}")
+            remaining.extend(chat_entries)
+            continue
+
+        for i in range(0, len(chat_entries), 100):
+            batch = chat_entries[i:i + 100]
+            messages = await client.get_messages(entity, ids=[e["message_id"] for e in batch])
+            for entry, message in zip(batch, messages):
+                if message is None or not message.media:
+                    logging.error(f"Deferred message {entry['message_id']} in {chat} no longer available")
+                    continue
+                if budget is not None and bytes_spent + get_media_size(message) > budget:
+                    remaining.append(entry)
+                    continue
+                try:
+                    os.makedirs(os.path.dirname(entry["path"]), exist_ok=True)
+                    await download_to_path(client, message, entry["path"])
+                except Exception as e:
+                    logging.error(f"Deferred download failed for message {entry['message_id']}: {e}")
+                    remaining.append(entry)
+
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for entry in remaining:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, manifest_path)
+    print(f"Deferred media fetched: {len(entries) - len(remaining)} | still deferred: {len(remaining)}")
+
 def update_scraping_status(status, group_name, data_type):
     logging.info(f"Status update: {status} - Group: {group_name}, Data Type: {data_type}")
 
@@ -154,6 +416,9 @@ def save_youtube_transcript_to_file(url, transcript_folder):
     Saves transcript using video title.
     If transcript fails → saves error + FULL VIDEO DESCRIPTION.
     """
+    import yt_dlp
+    from youtube_transcript_api import YouTubeTranscriptApi, NoTranscriptFound
+
     os.makedirs(transcript_folder, exist_ok=True)
 
     # Extract video ID
@@ -240,7 +505,7 @@ def save_youtube_transcript_to_file(url, transcript_folder):
     return filename
 
 # Main processing function
-async def process_chat(client, chat, scrape_date_folder, datatype_filter, scrape_date):
+async def process_chat(client, chat, scrape_date_folder, datatype_filter, scrape_date, rebalance_flood=False):
     folders = {
         "Images": os.path.join(scrape_date_folder, chat, "Images"),
         "Videos": os.path.join(scrape_date_folder, chat, "Videos"),
@@ -260,12 +525,30 @@ async def process_chat(client, chat, scrape_date_folder, datatype_filter, scrape
     text_file_path = selected_folders.get("Text")
     links_file_path = selected_folders.get("Links")
 
+    album_manifest_path = os.path.join(scrape_date_folder, chat, "albums.jsonl")
+    appended_paths = [album_manifest_path]
+    if text_file_path:
+        appended_paths.append(os.path.join(text_file_path, "messages.txt"))
+    if links_file_path:
+        appended_paths.append(os.path.join(links_file_path, "links.txt"))
+    # A chat handed to another account after a flood wait starts over from its newest
+    # message, so everything this attempt appended is rolled back to these sizes
+    start_sizes = {path: os.path.getsize(path) if os.path.exists(path) else 0 for path in appended_paths}
+
     if text_file_path:
         text_file = open(os.path.join(text_file_path, "messages.txt"), "a", encoding="utf-8")
     if links_file_path:
         links_file = open(os.path.join(links_file_path, "links.txt"), "a", encoding="utf-8")
 
     link_count = 0  # NOW DEFINED!
+    album = []
+
+    async def flush_album():
+        try:
+            await handle_album(client, album, selected_folders, datatype_filter, album_manifest_path)
+        except Exception as e:
+            logging.exception(f"Error processing album {album[0].grouped_id}: {e}")
+        album.clear()
 
     try:
         entity = await client.get_entity(chat)
@@ -313,19 +596,19 @@ async def process_chat(client, chat, scrape_date_folder, datatype_filter, scrape
                 link_count += len(urls)
                 processed = True
 
+            # === ALBUMS: members arrive back to back, collect them and download as a unit ===
+            media_target = get_media_target(message, selected_folders, datatype_filter)
+            if album and album[0].grouped_id != message.grouped_id:
+                await flush_album()
+            if message.grouped_id and media_target:
+                album.append(message)
+                continue
+
             # === MEDIA & TEXT HANDLING ===
             try:
-                if message.photo and "Images" in datatype_filter:
-                    await handle_media(client, message, selected_folders["Images"], "jpg")
-                    processed = True
-
-                elif message.video and "Videos" in datatype_filter:
-                    await handle_media(client, message, selected_folders["Videos"], "mp4")
-                    processed = True
-
-                elif (message.audio or message.voice or message.video_note) and "Audios" in datatype_filter:
-                    ext = "ogg" if message.voice else "mp3" if message.audio else "mp4"
-                    await handle_media(client, message, selected_folders["Audios"], ext)
+                if media_target:
+                    data_type, media_folder, ext = media_target
+                    await handle_media(client, message, media_folder, ext, data_type)
                     processed = True
 
                 elif "Text" in datatype_filter and message_text.strip() and message.message:
@@ -343,10 +626,22 @@ async def process_chat(client, chat, scrape_date_folder, datatype_filter, scrape
             except Exception as e:
                 logging.exception(f"Error processing message {message.id}: {e}")
 
+        if album:
+            await flush_album()
+
         print(f"Finished {chat} -> {link_count} links saved!")
         logging.info(f"Scraping completed for {chat} on {scrape_date.strftime('%Y-%m-%d')}.")
 
     except FloodWaitError as e:
+        if rebalance_flood and e.seconds >= FLOOD_REBALANCE_SECONDS:
+            for f in (text_file, links_file):
+                if f:
+                    f.close()
+            text_file = links_file = None
+            for path, size in start_sizes.items():
+                if os.path.exists(path) and os.path.getsize(path) > size:
+                    os.truncate(path, size)
+            raise  # The session pool hands this chat to another account
         logging.warning(f"FloodWait: sleeping {e.seconds}s")
         await asyncio.sleep(e.seconds)
     except Exception as e:
@@ -354,53 +649,351 @@ async def process_chat(client, chat, scrape_date_folder, datatype_filter, scrape
     finally:
         if text_file:
             text_file.close()
+            # Only the lines appended by this run are read
+            index_chat_text(os.path.dirname(scrape_date_folder), os.path.basename(scrape_date_folder), chat)
         if links_file:
             links_file.close()
 
-# Main scraper
-async def start_scraping(selected_groups, selected_datatypes, scrape_dates, target_folder, api_id, api_hash):
-    async with TelegramClient(
-        'session_name', 
-        api_id, 
-        api_hash,
+# === ACCOUNT / SESSION POOL ===
+# Flood waits at least this long move the account's chats to the other accounts
+FLOOD_REBALANCE_SECONDS = config("FLOOD_REBALANCE_SECONDS", default=300, cast=int)
+
+def load_accounts(accounts_file, api_id, api_hash):
+    """
+    Reads a JSON list of {"api_id", "api_hash", "session"} entries.
+    Without a file the single .env account and 'session_name' session are used.
+    """
+    if not accounts_file:
+        return [{"api_id": api_id, "api_hash": api_hash, "session": "session_name"}]
+    with open(accounts_file, "r", encoding="utf-8") as f:
+        accounts = json.load(f)
+    for i, account in enumerate(accounts):
+        account.setdefault("session", f"session_{i}")
+    return accounts
+
+def make_client(account):
+    return TelegramClient(
+        account["session"],
+        account["api_id"],
+        account["api_hash"],
         connection=ConnectionTcpFull,
         request_retries=10,
         connection_retries=10,
         retry_delay=2,
         proxy=None,
         system_version="Windows",
-        timeout=20) as client:
-        try:
-            await client.start()
-        except SessionPasswordNeededError:
-            password = input("2FA Password: ")
-            await client.start(password=password)
+        timeout=20)
+
+def account_for_chat(chat, account_count):
+    # Stable across runs, so a chat keeps landing on the account that already knows it
+    return zlib.crc32(chat.lower().encode("utf-8")) % account_count
+
+async def scrape_with_pool(clients, accounts, jobs, selected_datatypes, assign):
+    """
+    Runs (scrape_date, date_folder, chat) jobs across several accounts.
+    assign="hash" pins chats to accounts by hash, assign="load" lets any free account
+    take the next chat. An account hitting a long flood wait gives its chats away and
+    sleeps it out.
+    """
+    account_count = len(clients)
+    if assign == "load":
+        shared = deque(jobs)
+        queues = [shared] * account_count
+    else:
+        queues = [deque() for _ in clients]
+        for job in jobs:
+            queues[account_for_chat(job[2], account_count)].append(job)
+    cooling_until = [0.0] * account_count
+    pending = [len(jobs)]
+    loop = asyncio.get_running_loop()
+
+    def rebalance(index, job):
+        available = [i for i in range(account_count) if i != index and cooling_until[i] <= loop.time()]
+        if assign == "load" or not available:
+            queues[index].appendleft(job)
+            return
+        moved = [job] + list(queues[index])
+        queues[index].clear()
+        for n, moved_job in enumerate(moved):
+            queues[available[n % len(available)]].append(moved_job)
+        logging.warning(f"Moved {len(moved)} chats from {accounts[index]['session']} to other accounts")
+
+    async def worker(index, client):
+        name = accounts[index]["session"]
+        while pending[0]:
+            if not queues[index]:
+                await asyncio.sleep(1)  # Jobs may still be handed over by a flooded account
+                continue
+            scrape_date, date_folder, chat = queues[index].popleft()
+            print(f"Scraping {chat} | {scrape_date.strftime('%Y-%m-%d')} [{name}]")
+            try:
+                await process_chat(client, chat, date_folder, selected_datatypes, scrape_date, rebalance_flood=True)
+            except FloodWaitError as e:
+                logging.warning(f"FloodWait on {name}: {e.seconds}s, rebalancing {chat}")
+                cooling_until[index] = loop.time() + e.seconds
+                rebalance(index, (scrape_date, date_folder, chat))
+                # Sleep in short steps, so the run ends as soon as the others finish every chat
+                while pending[0] and loop.time() < cooling_until[index]:
+                    await asyncio.sleep(min(1, cooling_until[index] - loop.time()))
+                continue
+            pending[0] -= 1
+
+    await asyncio.gather(*(worker(i, client) for i, client in enumerate(clients)))
 
+# Main scraper
+async def start_scraping(selected_groups, selected_datatypes, scrape_dates, target_folder, api_id, api_hash,
+                         fetch_deferred=False, accounts=None, assign="hash"):
+    accounts = accounts or load_accounts(None, api_id, api_hash)
+    async with AsyncExitStack() as stack:
+        clients = []
+        for account in accounts:
+            client = await stack.enter_async_context(make_client(account))
+            try:
+                await client.start()
+            except SessionPasswordNeededError:
+                password = input("2FA Password: ")
+                await client.start(password=password)
+            clients.append(client)
+
+        if fetch_deferred:
+            await fetch_deferred_media(clients[0], download_policy["deferred_manifest"])
+            return
+
+        jobs = []
         for scrape_date in scrape_dates:
             date_folder = os.path.join(target_folder, scrape_date.strftime("%Y-%m-%d"))
             os.makedirs(date_folder, exist_ok=True)
-
             for chat in selected_groups:
-                print(f"Scraping {chat} | {scrape_date.strftime('%Y-%m-%d')}")
-                await process_chat(client, chat, date_folder, selected_datatypes, scrape_date)
+                jobs.append((scrape_date, date_folder, chat))
+
+        if len(clients) > 1:
+            await scrape_with_pool(clients, accounts, jobs, selected_datatypes, assign)
+            return
+
+        for scrape_date, date_folder, chat in jobs:
+            print(f"Scraping {chat} | {scrape_date.strftime('%Y-%m-%d')}")
+            await process_chat(clients[0], chat, date_folder, selected_datatypes, scrape_date)
+
+# === MULTI-PROCESS SHARDING ===
+# Stdout lines the GUI parses; forwarded from workers untouched
+PROTOCOL_PREFIXES = ("BYTES_DOWNLOADED:", "FILE_DONE:")
+
+async def authorize_accounts(accounts):
+    # Log every account in once here, so workers never need to prompt for codes
+    for account in accounts:
+        async with make_client(account) as client:
+            try:
+                await client.start()
+            except SessionPasswordNeededError:
+                password = input("2FA Password: ")
+                await client.start(password=password)
+
+def copy_sessions_for_worker(accounts, worker_index):
+    """Each worker gets its own copy of every session file (SQLite can't be shared)."""
+    for account in accounts:
+        src = account["session"] + ".session"
+        dst = f"{account['session']}_w{worker_index}.session"
+        if os.path.exists(src):
+            shutil.copyfile(src, dst)
+
+def remove_worker_sessions(accounts, worker_index):
+    # The copies hold the accounts' auth keys; don't leave them lying around
+    for account in accounts:
+        for suffix in (".session", ".session-journal"):
+            try:
+                os.remove(f"{account['session']}_w{worker_index}{suffix}")
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logging.warning(f"Could not remove worker session copy: {e}")
+
+def exit_with_coordinator():
+    """
+    Workers get a pipe from the coordinator on stdin and exit as soon as it closes.
+    Stop in the GUI kills the coordinator (TerminateProcess on Windows, where no
+    SIGTERM handler runs), and its end of every pipe is closed with it.
+    """
+    def watch():
+        for _ in sys.stdin:
+            pass
+        os._exit(1)
+    threading.Thread(target=watch, daemon=True).start()
+
+def run_sharded(args, selected_groups, accounts):
+    """
+    Splits selected_groups across worker processes and merges their stdout into
+    one stream. Returns the worst worker exit code.
+    """
+    shards = [selected_groups[i::args.workers] for i in range(args.workers)]
+    shards = [shard for shard in shards if shard]
+    asyncio.run(authorize_accounts(accounts))
+
+    # A per-run byte budget is split evenly between the workers
+    budget_mb = args.byte_budget_mb / len(shards) if args.byte_budget_mb > 0 else 0
+    procs = []
+    try:
+        return run_workers(args, shards, accounts, budget_mb, procs)
+    finally:
+        for proc in procs:
+            if proc.poll() is None:
+                proc.terminate()
+        for proc in procs:
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        for i in range(len(shards)):
+            remove_worker_sessions(accounts, i)
+
+def run_workers(args, shards, accounts, budget_mb, procs):
+    for i, shard in enumerate(shards):
+        copy_sessions_for_worker(accounts, i)
+        cmd = [
+            sys.executable, os.path.abspath(__file__),
+            '--groups', ','.join(shard),
+            '--datatypes', args.datatypes,
+            '--dates', args.dates,
+            '--target_folder', args.target_folder,
+            '--thumbnail_only', args.thumbnail_only,
+            '--max_file_mb', args.max_file_mb,
+            '--byte_budget_mb', str(budget_mb),
+            '--assign', args.assign,
+            '--workers', '1',
+            '--worker_index', str(i),
+        ]
+        if args.accounts:
+            cmd += ['--accounts', args.accounts]
+        procs.append(subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            stdin=subprocess.PIPE,  # never written; closes when this process dies (see exit_with_coordinator)
+            text=True,
+            encoding='utf-8',
+            bufsize=1,
+        ))
+        print(f"Worker {i} started: {len(shard)} groups")
+
+    def stop_workers(signum, frame):
+        sys.exit(1)  # run_sharded's finally terminates the workers
+    signal.signal(signal.SIGTERM, stop_workers)
+
+    print_lock = threading.Lock()
+
+    def forward(i, proc):
+        for line in iter(proc.stdout.readline, ''):
+            line = line.rstrip()
+            with print_lock:
+                print(line if line.startswith(PROTOCOL_PREFIXES) else f"[w{i}] {line}", flush=True)
+
+    readers = [threading.Thread(target=forward, args=(i, proc), daemon=True) for i, proc in enumerate(procs)]
+    for reader in readers:
+        reader.start()
+    for reader in readers:
+        reader.join()
+    codes = [proc.wait() for proc in procs]
+    return max(codes, key=abs)
+
+# === STARTUP DIAGNOSTICS & IMPORT BENCHMARK ===
+def print_diagnostics():
+    import inspect
+    import telethon
+    print(f"Scraper is using Python executable: {sys.executable}")
+    print(f"Telethon version in scraper: {telethon.__version__}")
+    print(f"Telethon module path: {telethon.__file__}")
+    print(inspect.signature(telethon.client.messages.MessageMethods.iter_messages))
+
+def run_import_benchmark(top=15):
+    """
+    Imports this module (and the lazily loaded Links dependencies) in fresh
+    interpreters with -X importtime and prints where startup time goes.
+    """
+    def import_times(statement):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", statement],
+            capture_output=True, text=True, cwd=BASE_DIR,
+        )
+        if result.returncode != 0:
+            print(f"Import failed for '{statement}':\n{result.stderr.strip().splitlines()[-1]}")
+            return []
+        times = []
+        for line in result.stderr.splitlines():
+            # import time: self [us] | cumulative | imported package
+            parts = line.split("|")
+            if len(parts) == 3 and parts[1].strip().isdigit():
+                times.append((int(parts[1]), parts[2].rstrip()))
+        return times
+
+    module = os.path.splitext(os.path.basename(__file__))[0]
+    for label, statement in [
+        ("Scraper startup", f"import {module}"),
+        ("Links stage (lazy)", "import yt_dlp, youtube_transcript_api"),
+    ]:
+        times = import_times(statement)
+        if not times:
+            continue
+        top_level = [t for t in times if not t[1].startswith("  ")]
+        total_ms = sum(us for us, _ in top_level) / 1000
+        print(f"\n{label}: {total_ms:.1f} ms")
+        for us, name in sorted(times, reverse=True)[:top]:
+            print(f"  {us / 1000:8.1f} ms  {name.strip()}")
 
 # CLI
 if __name__ == '__main__':
+    # Ensure stdout uses UTF-8 encoding
+    if hasattr(sys.stdout, "reconfigure"):
+        sys.stdout.reconfigure(encoding='utf-8')
     print("===== Telegram Scraper + Links Started =====")
 
     parser = argparse.ArgumentParser(description="Telegram Scraper with Link Extraction")
-    parser.add_argument("--groups", type=str, required=True, help="group1,group2")
-    parser.add_argument("--datatypes", type=str, required=True, help="Images,Videos,Audios,Text,Links")
-    parser.add_argument("--dates", type=str, required=True, help="2025-11-09,2025-11-10")
+    parser.add_argument("--groups", type=str, default="", help="group1,group2")
+    parser.add_argument("--datatypes", type=str, default="", help="Images,Videos,Audios,Text,Links")
+    parser.add_argument("--dates", type=str, default="", help="2025-11-09,2025-11-10")
     parser.add_argument("--target_folder", type=str, default=os.path.join(BASE_DIR, "Database"))
+    # Download policy (defaults come from .env so GUI runs pick them up too)
+    parser.add_argument("--thumbnail_only", type=str, default=config("THUMBNAIL_ONLY", default=""),
+                        help="Data types that only download a preview thumbnail, e.g. Videos")
+    parser.add_argument("--max_file_mb", type=str, default=config("MAX_FILE_MB", default=""),
+                        help="Per data type size cap in MB, e.g. Videos=200,Audios=50")
+    parser.add_argument("--byte_budget_mb", type=float, default=config("BYTE_BUDGET_MB", default=0, cast=float),
+                        help="Max MB downloaded in this run (0 = unlimited)")
+    parser.add_argument("--fetch_deferred", action="store_true",
+                        help="Download media recorded in <target_folder>/deferred.jsonl and exit")
+    # Session pool
+    parser.add_argument("--accounts", type=str, default=config("ACCOUNTS_FILE", default=""),
+                        help="JSON file with a list of {api_id, api_hash, session} accounts")
+    parser.add_argument("--assign", type=str, choices=["hash", "load"], default=config("ACCOUNT_ASSIGN", default="hash"),
+                        help="Assign chats to accounts by hash of the chat name or by load")
+    # Sharding across processes
+    parser.add_argument("--workers", type=int, default=config("SCRAPER_WORKERS", default=1, cast=int),
+                        help="Number of worker processes the groups are split across")
+    parser.add_argument("--worker_index", type=int, default=None, help=argparse.SUPPRESS)
+    # Startup
+    parser.add_argument("--diagnostics", action="store_true",
+                        help="Print Python/Telethon versions and paths before scraping")
+    parser.add_argument("--import_benchmark", action="store_true",
+                        help="Measure import time of the scraper and its lazy dependencies, then exit")
 
     args = parser.parse_args()
+    if args.import_benchmark:
+        run_import_benchmark()
+        sys.exit(0)
+    if args.diagnostics:
+        print_diagnostics()
+    if not args.fetch_deferred and not (args.groups and args.datatypes and args.dates):
+        parser.error("--groups, --datatypes and --dates are required (unless --fetch_deferred)")
+
+    download_policy["thumbnail_only"] = {d.strip() for d in args.thumbnail_only.split(",") if d.strip()}
+    download_policy["max_file_bytes"] = parse_size_caps(args.max_file_mb)
+    download_policy["byte_budget"] = int(args.byte_budget_mb * 1024 * 1024) if args.byte_budget_mb > 0 else None
+    download_policy["deferred_manifest"] = os.path.join(args.target_folder, "deferred.jsonl")
+    os.makedirs(args.target_folder, exist_ok=True)
 
     selected_groups = [g.strip() for g in args.groups.split(",") if g.strip()]
     selected_datatypes = [d.strip() for d in args.datatypes.split(",") if d.strip()]
 
     dates_list = []
-    for d in args.dates.split(","):
+    for d in [d for d in args.dates.split(",") if d.strip()]:
         try:
             date_obj = datetime.strptime(d.strip(), "%Y-%m-%d").date()
             if date_obj > datetime.utcnow().date():
@@ -410,8 +1003,20 @@ if __name__ == '__main__':
         except ValueError:
             logging.error(f"Invalid date: {d}")
 
-    if not dates_list:
+    if not dates_list and not args.fetch_deferred:
         logging.error("No valid dates!")
         sys.exit(1)
 
-    asyncio.run(start_scraping(selected_groups, selected_datatypes, dates_list, args.target_folder, api_id, api_hash))
\ No newline at end of file
+    api_id = config("api_id")
+    api_hash = config("api_hash")
+    accounts = load_accounts(args.accounts, api_id, api_hash)
+
+    if args.workers > 1 and len(selected_groups) > 1 and not args.fetch_deferred:
+        sys.exit(run_sharded(args, selected_groups, accounts))
+    if args.worker_index is not None:
+        exit_with_coordinator()
+        for account in accounts:
+            account["session"] = f"{account['session']}_w{args.worker_index}"
+
+    asyncio.run(start_scraping(selected_groups, selected_datatypes, dates_list, args.target_folder, api_id, api_hash,
+                               fetch_deferred=args.fetch_deferred, accounts=accounts, assign=args.assign))
\ No newline at end of file
@@ -0,0 +1,213 @@
+import os,re,sys,sqlite3,argparse,logging
+from collections import Counter
+
+# === HASHTAG / KEYWORD INDEX ===
+# Inverted index over the scraped Database/<date>/<chat>/Text/messages.txt files,
+# stored as per (date, chat, term) counts in Database/text_index.db. messages.txt is
+# append-only, so every file remembers the byte offset indexed so far and an update
+# only reads what was appended since; queries never touch the text files.
+INDEX_FILE_NAME = "text_index.db"
+
+HEADER_RE = re.compile(r'^\[\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\] Sender ID: ')
+HASHTAG_RE = re.compile(r'#\w+')
+WORD_RE = re.compile(r'\b[^\W\d_]{3,}\b')
+STOPWORDS = {
+    "the", "and", "for", "are", "but", "not", "you", "all", "any", "can", "had", "her", "was",
+    "one", "our", "out", "has", "him", "his", "how", "its", "let", "who", "did", "get", "may",
+    "new", "now", "see", "two", "way", "she", "too", "use", "this", "that", "with", "have",
+    "from", "they", "will", "would", "there", "their", "what", "about", "which", "when",
+    "your", "were", "been", "more", "than", "then", "them", "into", "just", "also", "some",
+    "http", "https", "www", "com",
+}
+
+def index_path_for(database_dir):
+    return os.path.join(database_dir, INDEX_FILE_NAME)
+
+def open_index(db_path):
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS terms (
+            date TEXT NOT NULL,
+            chat TEXT NOT NULL,
+            term TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (date, chat, term)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_terms_term ON terms (term, date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_terms_chat ON terms (chat, date)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS indexed_files (
+            path TEXT PRIMARY KEY,
+            offset INTEGER NOT NULL
+        )
+    """)
+    conn.commit()
+    return conn
+
+def extract_terms(text):
+    """Counter of {(term, kind)} for one message; hashtags and keywords are casefolded
+    (as trends.db folds hashtags, so the two join)."""
+    terms = Counter()
+    for hashtag in HASHTAG_RE.findall(text):
+        terms[(hashtag.casefold(), "hashtag")] += 1
+    for word in WORD_RE.findall(HASHTAG_RE.sub(" ", text)):
+        word = word.casefold()
+        if word not in STOPWORDS:
+            terms[(word, "keyword")] += 1
+    return terms
+
+def index_messages_file(conn, messages_path, date, chat):
+    """Indexes whatever was appended to messages_path since the last call; returns lines read."""
+    path = os.path.abspath(messages_path)
+    row = conn.execute("SELECT offset FROM indexed_files WHERE path = ?", (path,)).fetchone()
+    offset = row[0] if row else 0
+    size = os.path.getsize(path)
+    if size < offset:
+        # File was replaced or truncated: drop what it contributed and start over
+        conn.execute("DELETE FROM terms WHERE date = ? AND chat = ?", (date, chat))
+        offset = 0
+    if size == offset:
+        return 0
+
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read(size - offset)
+    # Only complete lines; a half-written last line is picked up next time
+    end = data.rfind(b"\n") + 1
+    if end == 0:
+        return 0
+    lines = data[:end].decode("utf-8", errors="ignore").splitlines()
+
+    terms = Counter()
+    for line in lines:
+        if line and not HEADER_RE.match(line):
+            terms.update(extract_terms(line))
+    conn.executemany(
+        """
+        INSERT INTO terms VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (date, chat, term) DO UPDATE SET count = count + excluded.count
+        """,
+        [(date, chat, term, kind, count) for (term, kind), count in terms.items()],
+    )
+    conn.execute("INSERT OR REPLACE INTO indexed_files VALUES (?, ?)", (path, offset + end))
+    conn.commit()
+    return len(lines)
+
+def update_index(database_dir, conn=None):
+    """Brings the index up to date with every Database/<date>/<chat>/Text/messages.txt.
+    Unchanged files cost one stat each."""
+    own_conn = conn is None
+    conn = conn or open_index(index_path_for(database_dir))
+    known = dict(conn.execute("SELECT path, offset FROM indexed_files"))
+    updated = 0
+    for date in sorted(os.listdir(database_dir)):
+        date_dir = os.path.join(database_dir, date)
+        if not os.path.isdir(date_dir):
+            continue
+        for chat in sorted(os.listdir(date_dir)):
+            messages_path = os.path.join(date_dir, chat, "Text", "messages.txt")
+            if not os.path.isfile(messages_path):
+                continue
+            if os.path.getsize(messages_path) == known.get(os.path.abspath(messages_path)):
+                continue
+            index_messages_file(conn, messages_path, date, chat)
+            updated += 1
+    if own_conn:
+        conn.close()
+    return updated
+
+def index_chat_text(database_dir, date, chat):
+    """Called by the scraper once a chat's messages.txt is closed."""
+    messages_path = os.path.join(database_dir, date, chat, "Text", "messages.txt")
+    if not os.path.isfile(messages_path):
+        return
+    # Runs in the scraper's cleanup path: any failure (locked db, disk, I/O) must not
+    # stop the remaining chats, and update_index catches up later
+    try:
+        conn = open_index(index_path_for(database_dir))
+        try:
+            index_messages_file(conn, messages_path, date, chat)
+        finally:
+            conn.close()
+    except Exception as e:
+        logging.error(f"Text index update failed for {chat} on {date}: {e}")
+
+def top_terms(conn, start=None, end=None, chat=None, kind="hashtag", n=20):
+    """Top n (term, count) for a date window (inclusive), optionally one chat; kind None = both."""
+    sql = "SELECT term, SUM(count) AS total FROM terms WHERE 1 = 1"
+    params = []
+    if kind:
+        sql += " AND kind = ?"
+        params.append(kind)
+    if start:
+        sql += " AND date >= ?"
+        params.append(start)
+    if end:
+        sql += " AND date <= ?"
+        params.append(end)
+    if chat:
+        sql += " AND chat = ?"
+        params.append(chat)
+    sql += " GROUP BY term ORDER BY total DESC, term LIMIT ?"
+    params.append(n)
+    return conn.execute(sql, params).fetchall()
+
+def top_with_trends(conn, trends_db_path, start, end, chat=None, n=20):
+    """Top Telegram hashtags of the window next to their external trend counts
+    (trends.db from updated_fetch_important_topics): [(hashtag, telegram, external)]."""
+    conn.execute("ATTACH DATABASE ? AS trends", (trends_db_path,))
+    try:
+        sql = """
+            SELECT t.term, t.total, COALESCE(SUM(c.count), 0)
+            FROM (
+                SELECT term, SUM(count) AS total FROM terms
+                WHERE kind = 'hashtag' AND date BETWEEN ? AND ? {chat_filter}
+                GROUP BY term ORDER BY total DESC, term LIMIT ?
+            ) AS t
+            LEFT JOIN trends.trend_counts AS c
+                ON c.folded = t.term AND c.date BETWEEN ? AND ?
+            GROUP BY t.term, t.total
+            ORDER BY t.total DESC, t.term
+        """.format(chat_filter="AND chat = ?" if chat else "")
+        params = [start, end] + ([chat] if chat else []) + [n, start, end]
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.execute("DETACH DATABASE trends")
+
+def main():
+    parser = argparse.ArgumentParser(description="Hashtag / keyword index over scraped Telegram text")
+    parser.add_argument("database_dir", help="Scraper target folder (contains the <date> folders)")
+    parser.add_argument("--update", action="store_true", help="Index text appended since the last update")
+    parser.add_argument("--top", type=int, default=20, help="Number of terms to show")
+    parser.add_argument("--kind", choices=["hashtag", "keyword", "all"], default="hashtag")
+    parser.add_argument("--start", help="First date (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Last date (YYYY-MM-DD)")
+    parser.add_argument("--chat", help="Only this chat")
+    parser.add_argument("--trends_db", help="Show external trend counts from this trends.db next to each hashtag")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.database_dir):
+        print(f"Folder not found: {args.database_dir}")
+        sys.exit(1)
+
+    conn = open_index(index_path_for(args.database_dir))
+    if args.update:
+        print(f"Updated {update_index(args.database_dir, conn)} message files")
+
+    if args.trends_db:
+        if not (args.start and args.end):
+            print("--trends_db needs --start and --end.")
+            sys.exit(1)
+        rows = top_with_trends(conn, args.trends_db, args.start, args.end, args.chat, args.top)
+        for i, (term, count, external) in enumerate(rows, 1):
+            print(f"{i}. {term}  telegram={count}  trends={external}")
+    else:
+        kind = None if args.kind == "all" else args.kind
+        for i, (term, count) in enumerate(top_terms(conn, args.start, args.end, args.chat, kind, args.top), 1):
+            print(f"{i}. {term} ({count})")
+    conn.close()
+
+if __name__ == "__main__":
+    main()
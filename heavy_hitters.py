@@ -0,0 +1,127 @@
+import heapq
+
+# === STREAMING HEAVY HITTERS (SPACE-SAVING) ===
+# Keeps at most `capacity` counters however many distinct hashtags stream through.
+# Every item whose true count is above total/capacity is guaranteed to be kept, and
+# each kept count over-estimates the true one by at most its recorded error.
+# Summaries merge (sources, days, worker processes) and round-trip through plain
+# dicts, so a worker can return one as JSON / pickle.
+
+class SpaceSaving:
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.total = 0
+        self._heap = []  # (count, item), stale entries are skipped lazily
+
+    def __len__(self):
+        return len(self.counts)
+
+    def add(self, item, count=1):
+        self.total += count
+        if item in self.counts:
+            self.counts[item] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[item] = count
+            self.errors[item] = 0
+        else:
+            # Replace the smallest counter; the newcomer inherits its count as error
+            smallest, evicted = self._pop_min()
+            del self.counts[evicted]
+            del self.errors[evicted]
+            self.counts[item] = smallest + count
+            self.errors[item] = smallest
+        self._push(item)
+
+    def update(self, items):
+        """Adds an iterable of items, or of (item, count) pairs."""
+        for entry in items:
+            if isinstance(entry, tuple):
+                self.add(*entry)
+            else:
+                self.add(entry)
+        return self
+
+    def min_count(self):
+        """Upper bound for the count of any item that is not kept."""
+        if len(self.counts) < self.capacity:
+            return 0
+        return self._peek_min()
+
+    def estimate(self, item):
+        return self.counts.get(item, self.min_count())
+
+    def merge(self, other):
+        """Adds another summary into this one (mergeable-summaries rule)."""
+        own_min, other_min = self.min_count(), other.min_count()
+        counts, errors = {}, {}
+        # Stable order (not set order), so ties come out the same on every run
+        items = list(self.counts) + [item for item in other.counts if item not in self.counts]
+        for item in items:
+            count, error = 0, 0
+            for summary, floor in ((self, own_min), (other, other_min)):
+                if item in summary.counts:
+                    count += summary.counts[item]
+                    error += summary.errors[item]
+                else:
+                    count += floor
+                    error += floor
+            counts[item], errors[item] = count, error
+        kept = sorted(counts, key=lambda item: (-counts[item], errors[item], item))[:self.capacity]
+        self.counts = {item: counts[item] for item in kept}
+        self.errors = {item: errors[item] for item in kept}
+        self.total += other.total
+        self._heap = [(count, item) for item, count in self.counts.items()]
+        heapq.heapify(self._heap)
+        return self
+
+    def top(self, n=10):
+        """[(item, estimated count, max over-estimate)] by estimated count; ties go to the
+        tighter estimate, then to the smaller item, so the order is deterministic."""
+        items = sorted(self.counts, key=lambda item: (-self.counts[item], self.errors[item], item))[:n]
+        return [(item, self.counts[item], self.errors[item]) for item in items]
+
+    def to_dict(self):
+        return {
+            "capacity": self.capacity,
+            "total": self.total,
+            "counts": self.counts,
+            "errors": self.errors,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        summary = cls(data["capacity"])
+        summary.total = data["total"]
+        summary.counts = dict(data["counts"])
+        summary.errors = dict(data["errors"])
+        summary._heap = [(count, item) for item, count in summary.counts.items()]
+        heapq.heapify(summary._heap)
+        return summary
+
+    def _push(self, item):
+        heapq.heappush(self._heap, (self.counts[item], item))
+        if len(self._heap) > 4 * self.capacity:
+            # Drop the stale entries every increment leaves behind
+            self._heap = [(count, item) for item, count in self.counts.items()]
+            heapq.heapify(self._heap)
+
+    def _peek_min(self):
+        while True:
+            count, item = self._heap[0]
+            if self.counts.get(item) == count:
+                return count
+            heapq.heappop(self._heap)
+
+    def _pop_min(self):
+        self._peek_min()
+        return heapq.heappop(self._heap)
+
+def merge_all(summaries, capacity=None):
+    """One summary out of many (e.g. one per source, day or worker)."""
+    summaries = list(summaries)
+    merged = SpaceSaving(capacity or max((s.capacity for s in summaries), default=1000))
+    for summary in summaries:
+        merged.merge(summary)
+    return merged
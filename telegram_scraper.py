@@ -1,10 +1,11 @@
 import os, sys, subprocess, time, queue, re, logging, io, json
+from collections import deque
 from decouple import config
 from datetime import datetime, timedelta
 from pathlib import Path
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QGridLayout,
-    QLabel, QPushButton, QTextEdit, QCheckBox, QCalendarWidget,
+    QLabel, QPushButton, QPlainTextEdit, QCheckBox, QCalendarWidget,
     QLineEdit, QFileDialog, QGroupBox, QSpacerItem, QSizePolicy,
     QMessageBox, QDialog, QListWidget, QProgressBar, QMenu, QToolButton,
     QInputDialog
@@ -54,11 +55,16 @@ SELECTED_DATES_FILE_PATH = os.path.join("data_files",'selected_dates.txt')
 TARGET_FOLDER =config("TAR_DIR", default=os.getcwd())
 CONFIG_FILE = os.path.join("data_files", "config.json")
 
+# Lines kept in the log view; everything is also written to data_files/app.log
+LOG_MAX_LINES = config("LOG_MAX_LINES", default=5000, cast=int)
+LOG_LINES_PER_TICK = 500  # rendered per log_timer tick, the rest waits for the next one
+
 # ====================== Worker Thread ======================
 class ScraperThread(QThread):
     log_signal = pyqtSignal(str, str)  # message, level
     progress_signal = pyqtSignal(int)
     bytes_signal = pyqtSignal(int)
+    file_done_signal = pyqtSignal(str)  # path of a fully downloaded file
     finished_signal = pyqtSignal(bool)  # success
     input_required_signal = pyqtSignal(str)  # prompt message
     
@@ -125,6 +131,8 @@ class ScraperThread(QThread):
                             self.bytes_signal.emit(bytes_val)
                         except:
                             pass
+                    elif line.startswith("FILE_DONE:"):
+                        self.file_done_signal.emit(line[len("FILE_DONE:"):])
                     elif "ERROR" in line.upper() or "FAILED" in line.upper():
                         self.log_signal.emit(line, "ERROR")
                     elif "WARNING" in line.upper():
@@ -155,7 +163,10 @@ class ScraperGUI(QMainWindow):
         self.dark_theme = True
         self.start_time = 0
         self.text_queue = queue.Queue()
+        self.log_lines = deque(maxlen=LOG_MAX_LINES)  # (timestamp, text, level) shown in the view
+        self.pending_log = []  # formatted, not rendered yet
         self.files_downloaded = 0
+        self.transcription_process = None
         
         # Settings for window geometry
         self.settings = QSettings("5AI", "Scraper")
@@ -231,7 +242,7 @@ class ScraperGUI(QMainWindow):
                 QPushButton#stopButton { background-color: #ff3333; }
                 QPushButton#stopButton:hover { background-color: #ff5555; }
                 QPushButton#themeButton { background-color: #222; padding: 8px; border-radius: 6px; }
-                QTextEdit, QLineEdit {
+                QPlainTextEdit, QLineEdit {
                     background-color: #2a2a38;
                     color: #e0e0e0;
                     border: 1px solid #444;
@@ -314,7 +325,7 @@ class ScraperGUI(QMainWindow):
                 QPushButton#stopButton { background-color: #ff3333; }
                 QPushButton#stopButton:hover { background-color: #ff5555; }
                 QPushButton#themeButton { background-color: #f0f0f0; padding: 8px; border-radius: 6px; color: #222; }
-                QTextEdit, QLineEdit {
+                QPlainTextEdit, QLineEdit {
                     background-color: white;
                     color: #222;
                     border: 1px solid #ccc;
@@ -361,6 +372,7 @@ class ScraperGUI(QMainWindow):
     def toggle_theme(self):
         self.dark_theme = not self.dark_theme
         self.apply_theme()
+        self.rerender_log()  # line colors depend on the theme
         self.append_log(f"Switched to {'Dark' if self.dark_theme else 'Light'} Theme", "INFO")
 
     def init_ui(self):
@@ -484,6 +496,12 @@ class ScraperGUI(QMainWindow):
         transcribe_layout.addWidget(self.btn_transcribe)
 
         left_layout.addLayout(transcribe_layout)
+
+        self.cb_auto_transcribe = QCheckBox("Auto-transcribe while scraping")
+        self.cb_auto_transcribe.setToolTip("Transcribe each video / voice note as soon as it is downloaded")
+        self.cb_auto_transcribe.setChecked(self.settings.value("auto_transcribe", False, type=bool))
+        self.cb_auto_transcribe.toggled.connect(lambda checked: self.settings.setValue("auto_transcribe", checked))
+        left_layout.addWidget(self.cb_auto_transcribe)
         
         self.btn_fetch_news = QPushButton("Fetch News")
         self.btn_fetch_news.clicked.connect(lambda: self.append_log("Fetch News - coming soon", "INFO"))
@@ -509,9 +527,10 @@ class ScraperGUI(QMainWindow):
         log_panel = QGroupBox("📝 Live Output Log")
         log_layout = QVBoxLayout()
         
-        self.log_text = QTextEdit()
+        self.log_text = QPlainTextEdit()
         self.log_text.setReadOnly(True)
         self.log_text.setFont(QFont("Consolas", 10))
+        self.log_text.setMaximumBlockCount(LOG_MAX_LINES)  # oldest lines drop off the top
         log_layout.addWidget(self.log_text)
         log_panel.setLayout(log_layout)
         middle_column.addWidget(log_panel, 3)
@@ -749,11 +768,13 @@ class ScraperGUI(QMainWindow):
 
     def clear_log(self):
         self.log_text.clear()
+        self.log_lines.clear()
         self.append_log("Log cleared", "INFO")
 
     def copy_log(self):
         QApplication.clipboard().setText(self.log_text.toPlainText())
-        self.append_log("Log copied to clipboard", "SUCCESS")
+        self.append_log(f"Log copied to clipboard (last {LOG_MAX_LINES} lines, full history in data_files/app.log)",
+                        "SUCCESS")
 
     # ====================== DATE MANAGEMENT ======================
     def add_date_preset(self, days):
@@ -1070,7 +1091,7 @@ class ScraperGUI(QMainWindow):
 
     # ====================== LOGGING ======================
     def append_log(self, text, level="INFO"):
-        if text.startswith("BYTES_DOWNLOADED:"): 
+        if text.startswith(("BYTES_DOWNLOADED:", "FILE_DONE:")):
             return
         
         # Filter out unwanted lines
@@ -1081,10 +1102,12 @@ class ScraperGUI(QMainWindow):
         text = re.sub(r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d+,\d+ - \w+ - ', '', text)
         
         timestamp = datetime.now().strftime("%H:%M:%S")
-        
-        cursor = self.log_text.textCursor()
-        cursor.movePosition(QTextCursor.MoveOperation.End)
-        
+        logging.info(f"[{level}] {text}")
+
+        # Rendered in batches by update_log_from_queue
+        self.pending_log.append((timestamp, text, level))
+
+    def log_formats(self, level):
         # Color coding
         if level == "ERROR":
             color = "#ff4444" if self.dark_theme else "#cc0000"
@@ -1098,21 +1121,50 @@ class ScraperGUI(QMainWindow):
         else:
             color = "#e0e0e0" if self.dark_theme else "#222222"
             icon = "ℹ"
-        
-        html = f'<span style="color: #888;">[{timestamp}]</span> <span style="color: {color};">{icon} {text}</span><br>'
-        cursor.insertHtml(html)
-        
-        # Auto-scroll to bottom
-        self.log_text.setTextCursor(cursor)
-        self.log_text.ensureCursorVisible()
+        text_format = QTextCharFormat()
+        text_format.setForeground(QColor(color))
+        return icon, text_format
+
+    def render_log_lines(self, lines):
+        """Appends lines to the view in one edit block, one text block per line."""
+        scrollbar = self.log_text.verticalScrollBar()
+        at_bottom = scrollbar.value() >= scrollbar.maximum() - 4
+
+        timestamp_format = QTextCharFormat()
+        timestamp_format.setForeground(QColor("#888888"))
+        formats = {}
+        cursor = QTextCursor(self.log_text.document())
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        cursor.beginEditBlock()
+        for timestamp, text, level in lines:
+            if level not in formats:
+                formats[level] = self.log_formats(level)
+            icon, text_format = formats[level]
+            if not self.log_text.document().isEmpty():
+                cursor.insertBlock()
+            cursor.insertText(f"[{timestamp}] ", timestamp_format)
+            cursor.insertText(f"{icon} {text}", text_format)
+        cursor.endEditBlock()
+
+        # Auto-scroll to bottom, unless the user scrolled up to read
+        if at_bottom:
+            scrollbar.setValue(scrollbar.maximum())
+
+    def rerender_log(self):
+        self.log_text.clear()
+        self.render_log_lines(self.log_lines)
 
     def update_log_from_queue(self):
         try:
-            while True:
+            for _ in range(LOG_LINES_PER_TICK):
                 text, level = self.text_queue.get_nowait()
                 self.append_log(text, level)
         except queue.Empty:
             pass
+        if self.pending_log:
+            lines, self.pending_log = self.pending_log, []
+            self.log_lines.extend(lines)
+            self.render_log_lines(lines[-LOG_MAX_LINES:])
 
     # ====================== SCRAPING CONTROL ======================
     def update_elapsed_time(self):
@@ -1199,6 +1251,7 @@ class ScraperGUI(QMainWindow):
         self.scraper_thread = ScraperThread(cmd)
         self.scraper_thread.log_signal.connect(lambda msg, lvl: self.text_queue.put((msg, lvl)))
         self.scraper_thread.bytes_signal.connect(self.update_bytes_downloaded)
+        self.scraper_thread.file_done_signal.connect(self.queue_for_transcription)
         self.scraper_thread.input_required_signal.connect(self.handle_input_request)
         self.scraper_thread.finished_signal.connect(self.scraping_finished)
         self.scraper_thread.start()
@@ -1264,10 +1317,42 @@ class ScraperGUI(QMainWindow):
                 self.scraper_thread.stop()
                 self.scraper_thread.wait()
 
+    def queue_for_transcription(self, path):
+        """Hands a downloaded file to a transcriber running with --stdin_events."""
+        if not self.cb_auto_transcribe.isChecked():
+            return
+        if self.transcription_process is None or self.transcription_process.poll() is not None:
+            script_path = 'updated_video_transcription.py'
+            if not os.path.exists(script_path):
+                self.append_log(f"✗ Script not found: {script_path}", "ERROR")
+                self.cb_auto_transcribe.setChecked(False)
+                return
+            self.transcription_process = subprocess.Popen(
+                [sys.executable, script_path, TARGET_FOLDER, '--stdin_events'],
+                stdin=subprocess.PIPE, text=True, encoding='utf-8'
+            )
+            self.append_log("✓ Auto-transcription started", "SUCCESS")
+        try:
+            self.transcription_process.stdin.write(f"FILE_DONE:{path}\n")
+            self.transcription_process.stdin.flush()
+        except OSError as e:
+            logging.error(f"Could not queue {path} for transcription: {e}")
+
+    def finish_auto_transcription(self):
+        # Closing stdin lets the transcriber finish its queue and exit
+        if self.transcription_process is not None:
+            try:
+                self.transcription_process.stdin.close()
+            except OSError:
+                pass
+            self.transcription_process = None
+            self.append_log("ℹ Auto-transcription is finishing the remaining files", "INFO")
+
     def scraping_finished(self, success):
         global scraping_active, current_process
         scraping_active = False
         current_process = None
+        self.finish_auto_transcription()
         
         self.status_light.setStyleSheet("color: #ff4444; font-size: 36px;")
         self.status_label.setText("Status: Idle")
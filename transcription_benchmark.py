@@ -0,0 +1,346 @@
+import os
+import sys
+import json
+import time
+import wave
+import shutil
+import argparse
+import subprocess
+import tempfile
+from datetime import datetime
+import numpy as np
+
+# Get the base directory
+base_dir = os.path.dirname(sys.executable) if getattr(sys, 'frozen', False) else os.path.dirname(os.path.abspath(__file__))
+
+SAMPLE_RATE = 16000
+FIXTURE_DIR = os.path.join(base_dir, "data_files", "bench_fixtures")
+STAGES = ["ffmpeg_wav", "ffmpeg_pipe", "whisper", "translate", "vosk", "faster_whisper"]
+
+
+# -------------------------
+# SYNTHETIC FIXTURES
+# -------------------------
+# Everything is generated locally: pure tones, and "speech-like" audio built from
+# a glottal pulse train shaped by vowel formants with a syllable-rate envelope.
+# Real recordings can be added with --speech_dir (any format ffmpeg reads). Whisper
+# and Vosk behave differently on synthetic audio (no words to decode, hallucinated
+# text), so rows measured on it are marked "representative": false in the report.
+VOWEL_FORMANTS = [(730, 1090), (270, 2290), (300, 870), (530, 1840), (570, 840)]
+
+
+def write_wav(path, audio):
+    pcm = (np.clip(audio, -1, 1) * 32767).astype(np.int16)
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(SAMPLE_RATE)
+        wf.writeframes(pcm.tobytes())
+
+
+def make_tone(seconds):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return 0.3 * np.sin(2 * np.pi * 440 * t)
+
+
+def resonate(signal, freq, bandwidth=80):
+    # Two-pole resonator, one per formant
+    r = np.exp(-np.pi * bandwidth / SAMPLE_RATE)
+    a1, a2 = -2 * r * np.cos(2 * np.pi * freq / SAMPLE_RATE), r * r
+    out = np.zeros_like(signal)
+    for i in range(2, len(signal)):
+        out[i] = signal[i] - a1 * out[i - 1] - a2 * out[i - 2]
+    return out
+
+
+def make_speech_like(seconds, seed=0):
+    rng = np.random.default_rng(seed)
+    syllable = int(0.25 * SAMPLE_RATE)
+    pieces = []
+    while sum(len(p) for p in pieces) < seconds * SAMPLE_RATE:
+        pitch = rng.uniform(100, 180)
+        pulses = np.zeros(syllable)
+        pulses[::int(SAMPLE_RATE / pitch)] = 1.0
+        f1, f2 = VOWEL_FORMANTS[rng.integers(len(VOWEL_FORMANTS))]
+        voiced = resonate(pulses, f1) + 0.5 * resonate(pulses, f2)
+        envelope = np.sin(np.linspace(0, np.pi, syllable)) ** 2
+        pieces.append(voiced * envelope)
+        if rng.random() < 0.2:  # short pause between "words"
+            pieces.append(np.zeros(int(rng.uniform(0.1, 0.4) * SAMPLE_RATE)))
+    audio = np.concatenate(pieces)[:int(seconds * SAMPLE_RATE)]
+    return 0.3 * audio / (np.abs(audio).max() or 1)
+
+
+def make_video(audio_path, video_path):
+    subprocess.run(
+        [
+            "ffmpeg", "-nostdin", "-loglevel", "error", "-y",
+            "-f", "lavfi", "-i", "testsrc=size=320x240:rate=25",
+            "-i", audio_path,
+            "-shortest", "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac",
+            video_path,
+        ],
+        check=True,
+    )
+
+
+def build_fixtures(durations, speech_dir=None):
+    """Returns {name: {"audio": wav path, "video": mp4 path, "seconds": duration, "synthetic": bool}}."""
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    fixtures = {}
+    for seconds in durations:
+        for kind, generator in [("tone", make_tone), ("speech", make_speech_like)]:
+            name = f"{kind}_{seconds}s"
+            wav_path = os.path.join(FIXTURE_DIR, name + ".wav")
+            mp4_path = os.path.join(FIXTURE_DIR, name + ".mp4")
+            if not os.path.exists(wav_path):
+                print(f"Generating {name}...")
+                write_wav(wav_path, generator(seconds))
+            if not os.path.exists(mp4_path):
+                make_video(wav_path, mp4_path)
+            fixtures[name] = {"audio": wav_path, "video": mp4_path, "seconds": seconds, "synthetic": True}
+
+    if speech_dir:
+        for file in sorted(os.listdir(speech_dir)):
+            src = os.path.join(speech_dir, file)
+            name = "real_" + os.path.splitext(file)[0]
+            wav_path = os.path.join(FIXTURE_DIR, name + ".wav")
+            mp4_path = os.path.join(FIXTURE_DIR, name + ".mp4")
+            if not os.path.exists(wav_path):
+                subprocess.run(
+                    ["ffmpeg", "-nostdin", "-loglevel", "error", "-y", "-i", src,
+                     "-ac", "1", "-ar", str(SAMPLE_RATE), wav_path],
+                    check=True,
+                )
+            if not os.path.exists(mp4_path):
+                make_video(wav_path, mp4_path)
+            with wave.open(wav_path, "rb") as wf:
+                seconds = wf.getnframes() / wf.getframerate()
+            fixtures[name] = {"audio": wav_path, "video": mp4_path, "seconds": round(seconds, 1),
+                              "synthetic": False}
+    return fixtures
+
+
+# -------------------------
+# PEAK MEMORY
+# -------------------------
+def peak_memory_mb():
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KiB on Linux
+    except ImportError:
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset / 1024 / 1024  # Windows
+        except (ImportError, AttributeError):
+            return None
+
+
+# -------------------------
+# ONE STAGE (runs in its own process so peak memory is per stage)
+# -------------------------
+def run_stage(stage, fixture, vosk_model_path):
+    import updated_video_transcription as vt
+
+    timings = {}
+    start = time.perf_counter()
+    if stage == "ffmpeg_wav":
+        out_path = os.path.join(tempfile.mkdtemp(), "out.wav")
+        vt.extract_audio(fixture["video"], out_path)
+        timings["total"] = time.perf_counter() - start
+        shutil.rmtree(os.path.dirname(out_path), ignore_errors=True)
+    elif stage == "ffmpeg_pipe":
+        vt.load_audio_pcm(fixture["video"])
+        timings["total"] = time.perf_counter() - start
+    else:
+        audio = vt.load_audio_pcm(fixture["audio"])
+        timings["decode"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        if stage == "whisper":
+            vt.get_whisper_model("base")
+        elif stage == "translate":
+            vt.get_whisper_model("small")
+        elif stage == "vosk":
+            if not os.path.exists(vosk_model_path):
+                return {"error": f"Vosk model not found: {vosk_model_path}"}
+            vt.get_vosk_model(vosk_model_path)
+        elif stage == "faster_whisper":
+            if not vt.FASTER_WHISPER_AVAILABLE:
+                return {"error": "faster-whisper not installed"}
+            vt.get_faster_whisper_model("base")
+        timings["load"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        if stage == "whisper":
+            vt.transcribe_whisper(audio)
+        elif stage == "translate":
+            vt.translate_to_english(audio)
+        elif stage == "vosk":
+            # As in production: decoded from the video through the ffmpeg pipe while recognising
+            vt.transcribe_vosk_stream(fixture["video"], vosk_model_path, return_segments=True)
+        elif stage == "faster_whisper":
+            segments, _ = vt.get_faster_whisper_model("base").transcribe(audio)
+            list(segments)
+        timings["transcribe"] = time.perf_counter() - start
+        timings["total"] = sum(timings.values())
+
+    work = timings.get("transcribe", timings["total"])
+    return {
+        "timings": {k: round(v, 3) for k, v in timings.items()},
+        "rtf": round(work / fixture["seconds"], 4),  # < 1 means faster than real time
+        "peak_mb": peak_memory_mb(),
+    }
+
+
+def run_workers(workers, fixture, copies, torch_threads):
+    """End-to-end throughput of the worker pool on copies of one video."""
+    import updated_video_transcription as vt
+
+    work_dir = tempfile.mkdtemp()
+    try:
+        paths = []
+        for i in range(copies):
+            path = os.path.join(work_dir, f"{i}.mp4")
+            shutil.copyfile(fixture["video"], path)
+            paths.append(path)
+        options = {
+            "transcription_folder": work_dir,
+            "videos_dir": work_dir,
+            "vosk_model_path": vt.VOSK_MODEL_PATH,
+            "lang_detect": "text",
+            "backend": "whisper",
+            "long_seconds": float("inf"),
+            "chunk_seconds": 120,
+        }
+        start = time.perf_counter()
+        if workers > 1:
+            list(vt.run_pool([[p] for p in paths], options, workers, torch_threads))
+        else:
+            for path in paths:
+                vt.process_video(path, options)
+        elapsed = time.perf_counter() - start
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return {
+        "timings": {"total": round(elapsed, 3)},
+        "rtf": round(elapsed / (fixture["seconds"] * copies), 4),
+        "peak_mb": peak_memory_mb(),  # parent only; workers are separate processes
+    }
+
+
+def run_isolated(extra_args):
+    """Runs this script in a child process and returns the JSON it prints last."""
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), *extra_args],
+        capture_output=True, text=True, cwd=base_dir,
+    )
+    lines = [line for line in result.stdout.splitlines() if line.startswith("{")]
+    if result.returncode != 0 or not lines:
+        return {"error": (result.stderr.strip().splitlines() or ["no output"])[-1]}
+    return json.loads(lines[-1])
+
+
+# -------------------------
+# REPORT
+# -------------------------
+def print_report(rows, baseline=None):
+    base = {(r["stage"], r["fixture"], r.get("workers", 1)): r for r in (baseline or {}).get("rows", [])}
+    print(f"\n{'stage':<16}{'fixture':<16}{'workers':>8}{'total s':>10}{'RTF':>9}{'peak MB':>10}  vs baseline")
+    print("-" * 85)
+    for row in rows:
+        if "error" in row:
+            print(f"{row['stage']:<16}{row['fixture']:<16}{row.get('workers', 1):>8}  {row['error']}")
+            continue
+        peak = f"{row['peak_mb']:.0f}" if row.get("peak_mb") else "-"
+        delta = ""
+        old = base.get((row["stage"], row["fixture"], row.get("workers", 1)))
+        if old and "rtf" in old and old["rtf"]:
+            delta = f"{(row['rtf'] - old['rtf']) / old['rtf']:+.0%} RTF"
+        fixture = row["fixture"] + ("" if row.get("representative", True) else "*")
+        print(f"{row['stage']:<16}{fixture:<16}{row.get('workers', 1):>8}"
+              f"{row['timings']['total']:>10.2f}{row['rtf']:>9.3f}{peak:>10}  {delta}")
+    if not all(row.get("representative", True) for row in rows):
+        print("* synthetic audio, not representative of real speech (add recordings with --speech_dir)")
+
+
+# -------------------------
+# MAIN
+# -------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark transcription stages and worker counts")
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"Comma separated: {','.join(STAGES)}")
+    parser.add_argument("--durations", default="10,60", help="Synthetic fixture lengths in seconds")
+    parser.add_argument("--speech_dir", default=None, help="Folder of real speech clips to add as fixtures")
+    parser.add_argument("--workers", default="1", help="Worker counts for the pool benchmark, e.g. 1,2,4")
+    parser.add_argument("--copies", type=int, default=4, help="Files per worker-pool run")
+    parser.add_argument("--torch_threads", type=int, default=0)
+    parser.add_argument("--vosk_model", default=None, help="Vosk model folder (default: VOSK_MODEL_PATH)")
+    parser.add_argument("--output", default=os.path.join(base_dir, "data_files", "bench_report.json"))
+    parser.add_argument("--compare", default=None, help="Earlier report to compare against")
+    # Internal: run a single measurement in this process
+    parser.add_argument("--run_stage", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--run_workers", type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--fixture", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_stage or args.run_workers:
+        fixture = json.loads(args.fixture)
+        if args.run_stage:
+            vosk_model_path = args.vosk_model
+            if not vosk_model_path:
+                import updated_video_transcription as vt
+                vosk_model_path = vt.VOSK_MODEL_PATH
+            print(json.dumps(run_stage(args.run_stage, fixture, vosk_model_path)))
+        else:
+            print(json.dumps(run_workers(args.run_workers, fixture, args.copies, args.torch_threads)))
+        return
+
+    durations = [int(d) for d in args.durations.split(",") if d.strip()]
+    fixtures = build_fixtures(durations, args.speech_dir)
+    if not args.speech_dir:
+        print("No --speech_dir given: every fixture is synthetic, so the RTF figures are not representative.")
+    rows = []
+
+    for stage in [s.strip() for s in args.stages.split(",") if s.strip()]:
+        for name, fixture in fixtures.items():
+            print(f"Running {stage} on {name}...")
+            child_args = ["--run_stage", stage, "--fixture", json.dumps(fixture)]
+            if args.vosk_model:
+                child_args += ["--vosk_model", args.vosk_model]
+            rows.append({"stage": stage, "fixture": name, "workers": 1,
+                         "representative": not fixture["synthetic"], **run_isolated(child_args)})
+
+    # Real recordings first, so the pool runs on one when --speech_dir is given
+    speech = [name for name in fixtures if name.startswith("real_")]
+    speech += [name for name in fixtures if name.startswith("speech_")]
+    for workers in [int(w) for w in args.workers.split(",") if w.strip()]:
+        for name in speech[:1]:
+            print(f"Running worker pool x{workers} on {args.copies} copies of {name}...")
+            result = run_isolated([
+                "--run_workers", str(workers), "--copies", str(args.copies),
+                "--torch_threads", str(args.torch_threads), "--fixture", json.dumps(fixtures[name]),
+            ])
+            rows.append({"stage": "pool", "fixture": name, "workers": workers,
+                         "representative": not fixtures[name]["synthetic"], **result})
+
+    baseline = None
+    if args.compare and os.path.exists(args.compare):
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(rows, baseline)
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({
+            "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "python": sys.version.split()[0],
+            "cpu_count": os.cpu_count(),
+            "rows": rows,
+        }, f, indent=2)
+    print(f"\nReport saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,117 @@
-import datetime,requests,re,os
+import datetime,requests,re,os,json,time,hashlib,sqlite3,argparse,threading
 from decouple import config
 from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor, wait, as_completed
+from requests.adapters import HTTPAdapter
+from heavy_hitters import SpaceSaving, merge_all
+
+# Seconds one source may take before its (partial) result is given up on
+SOURCE_TIMEOUT_SECONDS = config("TREND_SOURCE_TIMEOUT", default=15, cast=float)
+
+# === HTTP SESSION + RESPONSE CACHE ===
+# One pooled session for every trend API (keep-alive, no TCP/TLS setup per call),
+# and an on-disk cache keyed by (source, date, params). Fresh entries are served
+# without a request; stale ones are revalidated with ETag / Last-Modified when the
+# API sent them, and served as-is if the API is down.
+TREND_CACHE_DIR = config("TREND_CACHE_DIR", default=os.path.join("data_files", "trend_cache"))
+TREND_CACHE_TTL = {  # seconds
+    "google": 6 * 3600,
+    "youtube": 3600,
+    "twitter": 15 * 60,
+}
+
+session = requests.Session()
+session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+
+def cache_path(source, date, params):
+    key = json.dumps([source, date, params], sort_keys=True)
+    return os.path.join(TREND_CACHE_DIR, f"{source}_{hashlib.sha1(key.encode()).hexdigest()}.json")
+
+def read_cache(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_cache(path, entry):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(entry, f)
+    os.replace(tmp_path, path)
+
+def is_fresh(entry, source):
+    return entry is not None and time.time() - entry["fetched_at"] < TREND_CACHE_TTL.get(source, 3600)
+
+def cached_get_json(source, date, url, params=None, headers=None, cache_params=None, timeout=SOURCE_TIMEOUT_SECONDS):
+    """GET url through the shared session and the cache. cache_params identifies the
+    request in the cache key (defaults to params; leave API keys out of it)."""
+    path = cache_path(source, date, cache_params if cache_params is not None else params)
+    entry = read_cache(path)
+    if is_fresh(entry, source):
+        return entry["body"]
+
+    headers = dict(headers or {})
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    try:
+        response = session.get(url, params=params, headers=headers, timeout=timeout)
+    except requests.RequestException:
+        if entry:
+            print(f"{source}: request failed, using cached response")
+            return entry["body"]
+        raise
+    if response.status_code == 304 and entry:
+        entry["fetched_at"] = time.time()
+        write_cache(path, entry)
+        return entry["body"]
+    if not response.ok and entry:
+        print(f"{source}: HTTP {response.status_code}, using cached response")
+        return entry["body"]
+
+    body = response.json()
+    if response.ok:
+        write_cache(path, {
+            "fetched_at": time.time(),
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "body": body,
+        })
+    return body
 
 # Function to fetch Google Trends for worldwide trends
-def fetch_google_trends(date):
+def fetch_google_trends(date, timeout=SOURCE_TIMEOUT_SECONDS):
     try:
+        # pytrends keeps its own session, so its parsed result is what gets cached
+        path = cache_path("google", date, {"pn": "worldwide"})
+        entry = read_cache(path)
+        if is_fresh(entry, "google"):
+            return entry["body"]
         from pytrends.request import TrendReq
-        pytrends = TrendReq()
+        pytrends = TrendReq(timeout=(min(5, timeout), timeout))
         print(f"Fetching Google Trends (Worldwide) for {date}...")
         pytrends.build_payload([], timeframe=f'{date} 1-d')  # Fetch trends for the specific date
         trending = pytrends.trending_searches(pn='worldwide')
         # Extract hashtags from the trending searches
         hashtags = [re.findall(r'#\w+', topic) for topic in trending[0].tolist()]
-        return [hashtag for sublist in hashtags for hashtag in sublist]  # Flatten the list
+        hashtags = [hashtag for sublist in hashtags for hashtag in sublist]  # Flatten the list
+        write_cache(path, {"fetched_at": time.time(), "body": hashtags})
+        return hashtags
     except Exception as e:
         print(f"Error fetching Google trends: {e}")
-        return []
+        return None
 
 # Function to fetch YouTube Trends globally
-def fetch_youtube_trends(api_key, date):
+def fetch_youtube_trends(api_key, date, timeout=SOURCE_TIMEOUT_SECONDS):
     try:
         print(f"Fetching YouTube Trends (Global) for {date}...")
-        url = f"https://www.googleapis.com/youtube/v3/videos?part=snippet&chart=mostPopular&regionCode=global&key={api_key}"
-        response = requests.get(url).json()
+        url = "https://www.googleapis.com/youtube/v3/videos"
+        params = {"part": "snippet", "chart": "mostPopular", "regionCode": "global"}
+        response = cached_get_json("youtube", date, url, params={**params, "key": api_key},
+                                   cache_params=params, timeout=timeout)
         print(f"YouTube API Response: {response}")  # Log the response for debugging
         if 'items' in response:
             # Extract hashtags from the video descriptions or titles
@@ -32,20 +121,22 @@ def fetch_youtube_trends(api_key, date):
                 hashtags.extend(re.findall(r'#\w+', item['snippet']['description']))
             return hashtags
         else:
+            # Error payloads (quota, bad key...) have no items
             print("No YouTube trends found.")
-            return []
+            return None
     except Exception as e:
         print(f"Error fetching YouTube trends: {e}")
-        return []
+        return None
 
 # Function to fetch Twitter Trends globally (using a global location ID for major cities)
-def fetch_twitter_trends(bearer_token, date):
+def fetch_twitter_trends(bearer_token, date, timeout=SOURCE_TIMEOUT_SECONDS):
     try:
         print(f"Fetching Twitter Trends (Global) for {date}...")
         location_id = 1  # Worldwide location ID (or you can try major cities as an approximation)
         url = f"https://api.twitter.com/1.1/trends/place.json?id={location_id}"
         headers = {"Authorization": f"Bearer {bearer_token}"}
-        response = requests.get(url, headers=headers).json()
+        response = cached_get_json("twitter", date, url, headers=headers,
+                                   cache_params={"id": location_id}, timeout=timeout)
         print(f"Twitter API Response: {response}")  # Log the response for debugging
         if response and 'trends' in response[0]:
             # Extract hashtags from the Twitter trends
@@ -53,61 +144,365 @@ def fetch_twitter_trends(bearer_token, date):
             return [hashtag for sublist in hashtags for hashtag in sublist]  # Flatten the list
         else:
             print("No Twitter trends found.")
-            return []
+            return None
     except Exception as e:
         print(f"Error fetching Twitter trends: {e}")
-        return []
+        return None
 
 # Function to fetch Instagram Trends (Placeholder)
-def fetch_instagram_trends(date):
+def fetch_instagram_trends(date, timeout=SOURCE_TIMEOUT_SECONDS):
     print(f"Fetching Instagram Trends (Placeholder) for {date}...")
     return ["#ExampleTrend1", "#ExampleTrend2", "#TrendingExample"]  # Placeholder trends
 
-# Function to get global trending topics (hashtags)
-def get_global_trending_hashtags(youtube_api_key, twitter_bearer_token, date):
+TREND_SOURCES = ["google", "youtube", "twitter", "instagram"]
+# These APIs only return what is trending right now, whatever date is asked for
+SNAPSHOT_SOURCES = {"google", "youtube", "twitter"}
+# Canned data, never stored
+PLACEHOLDER_SOURCES = {"instagram"}
+
+def storable_sources(date, sources=TREND_SOURCES):
+    """Sources whose answer may be stored under date: snapshot sources only for today."""
+    today = datetime.date.today().isoformat()
+    return [
+        source for source in sources
+        if source not in PLACEHOLDER_SOURCES and (source not in SNAPSHOT_SOURCES or date == today)
+    ]
+
+def run_in_daemon_thread(fetch, *args, **kwargs):
+    """Future of fetch(*args, **kwargs) run on a daemon thread: unlike executor threads,
+    which are joined at interpreter exit, a hung call can't keep the process open."""
+    future = Future()
+
+    def run():
+        try:
+            future.set_result(fetch(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+# Function to fetch every source at once; total time is the slowest source, not the sum
+def fetch_all_sources(youtube_api_key, twitter_bearer_token, date, timeout=SOURCE_TIMEOUT_SECONDS, only=None):
+    """Returns {source: hashtags}. A source that fails or misses the timeout is None, so it
+    can be told apart from a source that answered with no hashtags."""
+    sources = {
+        "google": (fetch_google_trends, (date,)),
+        "youtube": (fetch_youtube_trends, (youtube_api_key, date)),
+        "twitter": (fetch_twitter_trends, (twitter_bearer_token, date)),
+        "instagram": (fetch_instagram_trends, (date,)),
+    }
+    if only is not None:
+        sources = {name: sources[name] for name in only}
+    futures = {
+        name: run_in_daemon_thread(fetch, *args, timeout=timeout)
+        for name, (fetch, args) in sources.items()
+    }
+    # The per-request timeouts bound each call; this bounds the whole source (retries, slow bodies...)
+    wait(futures.values(), timeout=timeout + 1)
+
+    results = {}
+    for name, future in futures.items():
+        if not future.done():
+            print(f"{name} trends timed out after {timeout:g}s, continuing without them.")
+            results[name] = None
+        elif future.exception():
+            print(f"Error fetching {name} trends: {future.exception()}")
+            results[name] = None
+        else:
+            results[name] = future.result()
+    return results
+
+# === TREND STORE (trends.db) ===
+# trend_raw keeps what each source returned for a day; trend_counts holds the
+# per-source daily counts every top-N query is answered from. Its folded column is the
+# hashtag casefolded in Python (SQLite's lower() only knows ASCII), the key hashtags
+# are compared on across sources and with the Telegram index.
+TRENDS_DB_PATH = config("TRENDS_DB", default=os.path.join("data_files", "trends.db"))
+
+def open_trend_store(db_path=TRENDS_DB_PATH):
+    if os.path.dirname(db_path):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS trend_raw (
+            date TEXT NOT NULL,
+            source TEXT NOT NULL,
+            hashtags TEXT NOT NULL,
+            fetched_at TEXT NOT NULL,
+            PRIMARY KEY (date, source)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS trend_counts (
+            date TEXT NOT NULL,
+            source TEXT NOT NULL,
+            hashtag TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            folded TEXT,
+            PRIMARY KEY (date, source, hashtag)
+        )
+    """)
+    if "folded" not in {row[1] for row in conn.execute("PRAGMA table_info(trend_counts)")}:
+        # Stores created before the column existed
+        conn.execute("ALTER TABLE trend_counts ADD COLUMN folded TEXT")
+        hashtags = [hashtag for (hashtag,) in conn.execute("SELECT DISTINCT hashtag FROM trend_counts")]
+        conn.executemany("UPDATE trend_counts SET folded = ? WHERE hashtag = ?",
+                         [(hashtag.casefold(), hashtag) for hashtag in hashtags])
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_trend_counts_hashtag ON trend_counts (hashtag, date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_trend_counts_folded ON trend_counts (folded, date)")
+    conn.commit()
+    return conn
+
+def store_trends(conn, date, trends):
+    """Replaces the stored day of every source in trends ({source: hashtags}). Failed
+    sources (None) are skipped, so whatever was stored for them before is kept, and so are
+    placeholder sources and snapshot sources for any day but today (see storable_sources)."""
+    fetched_at = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    allowed = storable_sources(date, list(trends))
+    stored = []
+    for source, hashtags in trends.items():
+        if hashtags is None or source not in allowed:
+            continue
+        conn.execute("INSERT OR REPLACE INTO trend_raw VALUES (?, ?, ?, ?)",
+                     (date, source, json.dumps(hashtags, ensure_ascii=False), fetched_at))
+        conn.execute("DELETE FROM trend_counts WHERE date = ? AND source = ?", (date, source))
+        conn.executemany("INSERT INTO trend_counts VALUES (?, ?, ?, ?, ?)",
+                         [(date, source, hashtag, count, hashtag.casefold())
+                          for hashtag, count in Counter(hashtags).items()])
+        stored.append(source)
+    conn.commit()
+    return stored
+
+def stored_sources(conn):
+    """{date: set of sources stored for it}"""
+    stored = {}
+    for date, source in conn.execute("SELECT date, source FROM trend_raw"):
+        stored.setdefault(date, set()).add(source)
+    return stored
+
+def top_hashtags(conn, start, end, n=10, sources=None):
+    """Top n (hashtag, count) over the dates start..end (inclusive), from the daily counts."""
+    sql = "SELECT hashtag, SUM(count) AS total FROM trend_counts WHERE date BETWEEN ? AND ?"
+    params = [start, end]
+    if sources:
+        sql += f" AND source IN ({','.join('?' * len(sources))})"
+        params += list(sources)
+    sql += " GROUP BY hashtag ORDER BY total DESC, hashtag LIMIT ?"
+    params.append(n)
+    return conn.execute(sql, params).fetchall()
+
+# === STREAMING TOP-N OVER LONG WINDOWS ===
+# Daily counts are streamed row by row into one Space-Saving summary per source
+# (bounded memory however many days and hashtags) and merged. Exact answers come from
+# a GROUP BY over the stores instead. The Telegram hashtag index (hashtag_index.py)
+# can be added to either as one more source.
+HEAVY_HITTER_CAPACITY = config("HEAVY_HITTER_CAPACITY", default=1000, cast=int)
+
+def stream_daily_counts(conn, start, end, sources=None):
+    """Yields (source, hashtag, count) from the daily counts without loading them all."""
+    sql = "SELECT source, hashtag, count FROM trend_counts WHERE date BETWEEN ? AND ?"
+    params = [start, end]
+    if sources:
+        sql += f" AND source IN ({','.join('?' * len(sources))})"
+        params += list(sources)
+    yield from conn.execute(sql, params)
+
+def stream_telegram_counts(index_db_path, start, end):
+    index = sqlite3.connect(index_db_path, timeout=30)
     try:
-        google_trends = fetch_google_trends(date)
-        youtube_trends = fetch_youtube_trends(youtube_api_key, date)
-        twitter_trends = fetch_twitter_trends(twitter_bearer_token, date)
-        instagram_trends = fetch_instagram_trends(date)
+        for term, count in index.execute(
+            "SELECT term, count FROM terms WHERE kind = 'hashtag' AND date BETWEEN ? AND ?", (start, end)
+        ):
+            yield "telegram", term, count
+    finally:
+        index.close()
+
+def heavy_hitters(rows, capacity=HEAVY_HITTER_CAPACITY):
+    """Summaries per source merged into one; hashtags are compared casefolded."""
+    summaries = {}
+    for source, hashtag, count in rows:
+        if source not in summaries:
+            summaries[source] = SpaceSaving(capacity)
+        summaries[source].add(hashtag.casefold(), count)
+    return merge_all(summaries.values(), capacity)
 
-        # Combine all hashtags from different sources
-        all_hashtags = google_trends + youtube_trends + twitter_trends + instagram_trends
+def exact_top_hashtags(conn, start, end, n=10, sources=None, index_db_path=None):
+    """Exact top n (hashtag, count) over the window, hashtags compared casefolded; one
+    GROUP BY over the daily counts and, with index_db_path, the Telegram hashtag index."""
+    sql = "SELECT folded AS hashtag, count FROM trend_counts WHERE date BETWEEN ? AND ?"
+    params = [start, end]
+    if sources:
+        sql += f" AND source IN ({','.join('?' * len(sources))})"
+        params += list(sources)
+    if index_db_path:
+        conn.execute("ATTACH DATABASE ? AS telegram", (index_db_path,))
+        sql += " UNION ALL SELECT term, count FROM telegram.terms WHERE kind = 'hashtag' AND date BETWEEN ? AND ?"
+        params += [start, end]
+    try:
+        return conn.execute(
+            f"SELECT hashtag, SUM(count) AS total FROM ({sql}) GROUP BY hashtag ORDER BY total DESC, hashtag LIMIT ?",
+            params + [n],
+        ).fetchall()
+    finally:
+        if index_db_path:
+            conn.execute("DETACH DATABASE telegram")
+
+def stream_top_hashtags(conn, start, end, n=10, sources=None, index_db_path=None,
+                        capacity=HEAVY_HITTER_CAPACITY):
+    """Top n (hashtag, count) over the window from the streaming summary. Counts are
+    estimates (see SpaceSaving); exact_top_hashtags gives the exact answer."""
+    rows = stream_daily_counts(conn, start, end, sources)
+    if index_db_path:
+        rows = (row for stream in (rows, stream_telegram_counts(index_db_path, start, end)) for row in stream)
+    summary = heavy_hitters(rows, capacity)
+    return [(hashtag, count) for hashtag, count, error in summary.top(n)]
+
+def date_range(start, end):
+    day = datetime.datetime.strptime(start, '%Y-%m-%d').date()
+    last = datetime.datetime.strptime(end, '%Y-%m-%d').date()
+    while day <= last:
+        yield day.isoformat()
+        day += datetime.timedelta(days=1)
+
+def backfill(conn, youtube_api_key, twitter_bearer_token, start, end, concurrency=4, refresh=False):
+    """Fetches the sources still missing for every date in start..end (at most concurrency
+    dates at once) into the store. Snapshot sources have no history, so past dates only
+    get sources that can answer for them; run this daily to build history from snapshots."""
+    stored = {} if refresh else stored_sources(conn)
+    todo, complete, no_history = {}, 0, 0
+    for date in date_range(start, end):
+        wanted = storable_sources(date)
+        if not wanted:
+            no_history += 1
+            continue
+        missing = [source for source in wanted if source not in stored.get(date, set())]
+        if missing:
+            todo[date] = missing
+        else:
+            complete += 1
+    print(f"Backfilling {len(todo)} dates ({complete} already stored)")
+    if no_history:
+        print(f"Skipped {no_history} past dates: {', '.join(sorted(SNAPSHOT_SOURCES))} "
+              f"only return current trends")
+    dates = list(todo)
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = {
+            executor.submit(fetch_all_sources, youtube_api_key, twitter_bearer_token, date, only=missing): date
+            for date, missing in todo.items()
+        }
+        # SQLite writes stay on this thread
+        for future in as_completed(futures):
+            date = futures[future]
+            try:
+                stored = store_trends(conn, date, future.result())
+                if stored:
+                    print(f"Stored {date} ({', '.join(stored)})")
+                else:
+                    print(f"Every source failed for {date}, nothing stored")
+            except Exception as e:
+                print(f"Backfill failed for {date}: {e}")
+    return dates
+
+# Function to get global trending topics (hashtags)
+def get_global_trending_hashtags(youtube_api_key, twitter_bearer_token, date, store=None):
+    try:
+        trends = fetch_all_sources(youtube_api_key, twitter_bearer_token, date)
+        if store is not None and not store_trends(store, date, trends):
+            print(f"Not stored: no source returned data that belongs to {date}.")
 
-        # Filter and only keep the hashtags that appear more than once (significant hashtags)
-        common_hashtags = Counter(all_hashtags).most_common()
+        # Combine all hashtags from different sources (one bounded summary per source)
+        summary = merge_all(
+            SpaceSaving(HEAVY_HITTER_CAPACITY).update(hashtags) for hashtags in trends.values() if hashtags
+        )
 
         # Get top 10 hashtags
-        top_10_hashtags = [hashtag for hashtag, count in common_hashtags[:10]]
+        top_10_hashtags = [hashtag for hashtag, count, error in summary.top(10)]
 
         return top_10_hashtags
     except Exception as e:
         print(f"Error fetching global hashtags: {e}")
         return []
 
-# Main function to execute
-if __name__ == "__main__":
-    # Ask for a date input
-    date_input = input("Enter the date (YYYY-MM-DD): ")
+def print_top(hashtags, title):
+    if hashtags:
+        print(f"\n{title}:")
+        for i, hashtag in enumerate(hashtags, 1):
+            print(f"{i}. {hashtag}")
+    else:
+        print("No significant global hashtags found.")
+
+def main():
+    parser = argparse.ArgumentParser(description="Global trending hashtags (asks for a date when run without options)")
+    parser.add_argument("--date", help="Fetch one date (YYYY-MM-DD)")
+    parser.add_argument("--backfill", nargs=2, metavar=("START", "END"),
+                        help="Fetch the dates from START to END that are missing from the trend store "
+                             "(current-only sources are stored for today only)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Dates fetched at once during --backfill")
+    parser.add_argument("--refresh", action="store_true", help="Re-fetch dates that are already stored")
+    parser.add_argument("--top", nargs=2, metavar=("START", "END"),
+                        help="Top hashtags of a date window, from the store only")
+    parser.add_argument("--source", action="append", help="Limit --top to this source (repeatable)")
+    parser.add_argument("--stream", action="store_true",
+                        help="--top through the bounded-memory heavy-hitters summary instead of GROUP BY")
+    parser.add_argument("--exact", action="store_true",
+                        help="--top with exact counts, hashtags compared case-insensitively across sources")
+    parser.add_argument("--telegram_index", help="With --stream or --exact, add Telegram hashtags from this text_index.db")
+    parser.add_argument("-n", type=int, default=10, help="Number of hashtags to show")
+    parser.add_argument("--db", default=TRENDS_DB_PATH, help="Trend store (SQLite)")
+    args = parser.parse_args()
 
     # Validate the date format
-    try:
-        datetime.datetime.strptime(date_input, '%Y-%m-%d')  # Check if the date is in the correct format
-    except ValueError:
-        print("Invalid date format. Please use YYYY-MM-DD.")
-        exit()
+    for date in [args.date] + (args.backfill or []) + (args.top or []):
+        try:
+            if date:
+                datetime.datetime.strptime(date, '%Y-%m-%d')  # Check if the date is in the correct format
+        except ValueError:
+            print("Invalid date format. Please use YYYY-MM-DD.")
+            exit()
+
+    store = open_trend_store(args.db)
+    if args.top:
+        if args.exact:
+            rows = exact_top_hashtags(store, args.top[0], args.top[1], args.n, args.source, args.telegram_index)
+        elif args.stream or args.telegram_index:
+            rows = stream_top_hashtags(store, args.top[0], args.top[1], args.n, args.source,
+                                       args.telegram_index)
+        else:
+            rows = top_hashtags(store, args.top[0], args.top[1], args.n, args.source)
+        print_top([f"{hashtag} ({count})" for hashtag, count in rows],
+                  f"Top {args.n} Hashtags {args.top[0]} .. {args.top[1]}")
+        store.close()
+        return
+
+    date_input = args.date
+    if not date_input and not args.backfill:
+        # Ask for a date input
+        date_input = input("Enter the date (YYYY-MM-DD): ")
+
+        # Validate the date format
+        try:
+            datetime.datetime.strptime(date_input, '%Y-%m-%d')  # Check if the date is in the correct format
+        except ValueError:
+            print("Invalid date format. Please use YYYY-MM-DD.")
+            exit()
 
     youtube_api_key = config("youtube_api_key")
     twitter_bearer_token = config("twitter_bearer_token")
 
     if not youtube_api_key or not twitter_bearer_token:
         print("Please set the YouTube API Key and Twitter Bearer Token as environment variables.")
+    elif args.backfill:
+        backfill(store, youtube_api_key, twitter_bearer_token, args.backfill[0], args.backfill[1],
+                 args.concurrency, args.refresh)
+        rows = top_hashtags(store, args.backfill[0], args.backfill[1], args.n)
+        print_top([f"{hashtag} ({count})" for hashtag, count in rows],
+                  f"Top {args.n} Hashtags {args.backfill[0]} .. {args.backfill[1]}")
     else:
-        top_10_hashtags = get_global_trending_hashtags(youtube_api_key, twitter_bearer_token, date_input)
+        top_10_hashtags = get_global_trending_hashtags(youtube_api_key, twitter_bearer_token, date_input, store=store)
+        print_top(top_10_hashtags, "Top 10 Trending Hashtags Globally")
+    store.close()
 
-        if top_10_hashtags:
-            print("\nTop 10 Trending Hashtags Globally:")
-            for i, hashtag in enumerate(top_10_hashtags, 1):
-                print(f"{i}. {hashtag}")
-        else:
-            print("No significant global hashtags found.")
\ No newline at end of file
+# Main function to execute
+if __name__ == "__main__":
+    main()
@@ -2,21 +2,109 @@ import subprocess
 import sys
 import os
 import json
+import math
 import wave
+import argparse
+import multiprocessing
+import sqlite3
+import hashlib
+import shutil
+import queue
+import threading
+import time
+from datetime import datetime
 import langdetect
+import numpy as np
+from decouple import config
 
 # Get the base directory
 base_dir = os.path.dirname(sys.executable) if getattr(sys, 'frozen', False) else os.path.dirname(os.path.abspath(__file__))
-print(base_dir)
+
+from vosk import Model, KaldiRecognizer
+import whisper
 
 try:
-    import tkinter
+    import psutil
+    PSUTIL_AVAILABLE = True
 except ImportError:
-    print("tkinter missing. Install Python with Tk support.")
-    sys.exit(1)
+    PSUTIL_AVAILABLE = False
+
+try:
+    from faster_whisper import WhisperModel
+    FASTER_WHISPER_AVAILABLE = True
+except ImportError:
+    FASTER_WHISPER_AVAILABLE = False
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    WATCHDOG_AVAILABLE = False
+
+VOSK_MODEL_PATH = config(
+    "VOSK_MODEL_PATH",
+    default=r"C:\\Users\\Ashutosh Mishra\\Desktop\\STUDY\\Coding\\vosk-model-en-us-0.22",
+)
+
+
+# -------------------------
+# MODEL REGISTRY
+# -------------------------
+# Each model is loaded once (on first use) and stays resident for the whole run.
+# Least recently used models are released when more than MAX_RESIDENT_MODELS are
+# loaded, or when free memory drops below MIN_FREE_MEMORY_MB (needs psutil).
+MAX_RESIDENT_MODELS = 2
+MIN_FREE_MEMORY_MB = 1024
+
+_loaded_models = {}  # key -> model, oldest use first
+
+
+def _free_memory_mb():
+    if not PSUTIL_AVAILABLE:
+        return None
+    return psutil.virtual_memory().available / (1024 * 1024)
 
-from vosk import Model, KaldiRecognizer
-import whisper
+
+def release_models(keys=None):
+    """Drop resident models (all of them when keys is None) so their memory can be reclaimed."""
+    for key in list(_loaded_models if keys is None else keys):
+        if _loaded_models.pop(key, None) is not None:
+            print(f"Released model: {key}")
+    try:
+        import torch
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    except ImportError:
+        pass
+
+
+def _make_room():
+    while len(_loaded_models) >= MAX_RESIDENT_MODELS:
+        release_models([next(iter(_loaded_models))])
+    free_mb = _free_memory_mb()
+    while _loaded_models and free_mb is not None and free_mb < MIN_FREE_MEMORY_MB:
+        release_models([next(iter(_loaded_models))])
+        free_mb = _free_memory_mb()
+
+
+def get_model(key, loader):
+    """Returns the resident model for key, loading it with loader() the first time."""
+    if key in _loaded_models:
+        _loaded_models[key] = _loaded_models.pop(key)  # mark as most recently used
+        return _loaded_models[key]
+    _make_room()
+    print(f"Loading model: {key}")
+    _loaded_models[key] = loader()
+    return _loaded_models[key]
+
+
+def get_whisper_model(name):
+    return get_model(f"whisper:{name}", lambda: whisper.load_model(name))
+
+
+def get_vosk_model(model_path):
+    return get_model(f"vosk:{model_path}", lambda: Model(model_path))
 
 
 # -------------------------
@@ -38,7 +126,7 @@ def transcribe_vosk(audio_path, model_path):
         print(f"Vosk model path not found: {model_path}")
         return ""
 
-    model = Model(model_path)
+    model = get_vosk_model(model_path)
     recognizer = KaldiRecognizer(model, 16000)
     text = ""
 
@@ -65,14 +153,28 @@ def transcribe_vosk(audio_path, model_path):
 # -------------------------
 # WHISPER TRANSCRIPTION
 # -------------------------
-def transcribe_whisper(audio_path):
+def whisper_segments(result, offset=0.0):
+    """Timed segments of a Whisper result, shifted by offset seconds."""
+    return [
+        {
+            "start": offset + segment["start"],
+            "end": offset + segment["end"],
+            "text": segment["text"],
+            "avg_logprob": segment.get("avg_logprob"),
+        }
+        for segment in result.get("segments", [])
+    ]
+
+
+def transcribe_whisper(audio, language=None, return_segments=False):
     try:
-        model = whisper.load_model("base")
-        result = model.transcribe(audio_path)
-        return result.get("text", "")
+        model = get_whisper_model("base")
+        result = model.transcribe(audio, language=language)
+        text = result.get("text", "")
+        return (text, whisper_segments(result)) if return_segments else text
     except Exception as e:
         print(f"Whisper failed: {e}")
-        return ""
+        return ("", []) if return_segments else ""
 
 
 # -------------------------
@@ -85,17 +187,31 @@ def detect_language(text):
         return "unknown"
 
 
+# -------------------------
+# DETECT LANGUAGE FROM AN AUDIO PREFIX
+# -------------------------
+def detect_language_from_audio(audio, seconds=30):
+    """Whisper's language ID on the first ~30 s only (one encoder pass, no decoding)."""
+    model = get_whisper_model("base")
+    clip = whisper.pad_or_trim(audio[:seconds * SAMPLE_RATE])
+    mel = whisper.log_mel_spectrogram(clip, n_mels=model.dims.n_mels).to(model.device)
+    _, probs = model.detect_language(mel)
+    language = max(probs, key=probs.get)
+    return language, probs[language]
+
+
 # -------------------------
 # TRANSLATE TO ENGLISH USING WHISPER
 # -------------------------
-def translate_to_english(audio_path):
+def translate_to_english(audio, language=None, return_segments=False):
     try:
-        model = whisper.load_model("small")
-        result = model.transcribe(audio_path, task="translate")
-        return result.get("text", "")
+        model = get_whisper_model("small")
+        result = model.transcribe(audio, task="translate", language=language)
+        text = result.get("text", "")
+        return (text, whisper_segments(result)) if return_segments else text
     except Exception as e:
         print(f"Translation failed: {e}")
-        return ""
+        return ("", []) if return_segments else ""
 
 
 # -------------------------
@@ -106,6 +222,109 @@ def extract_audio(video_path, output_audio_path):
     os.system(command)
 
 
+# -------------------------
+# STREAM AUDIO FROM FFMPEG (NO TEMP WAV)
+# -------------------------
+SAMPLE_RATE = 16000
+
+
+VIDEO_EXTENSIONS = ('.mkv', '.mp4', '.avi', '.mov')
+AUDIO_EXTENSIONS = ('.ogg', '.oga', '.opus', '.mp3', '.m4a', '.wav', '.flac')
+
+
+def is_audio_file(media_path):
+    return media_path.lower().endswith(AUDIO_EXTENSIONS)
+
+
+def ffmpeg_pcm_command(media_path, max_seconds=None):
+    # 16 kHz mono signed 16-bit PCM on stdout
+    if is_audio_file(media_path):
+        # Audio-only input: take the first audio stream, nothing else to demux
+        streams = ["-map", "0:a:0"]
+    else:
+        # Video container: drop video/subtitle/data streams before decoding
+        streams = ["-vn", "-sn", "-dn"]
+    return [
+        "ffmpeg", "-nostdin", "-loglevel", "error",
+        "-i", media_path,
+        *streams, "-ac", "1", "-ar", str(SAMPLE_RATE),
+        *(["-t", str(max_seconds)] if max_seconds else []),
+        "-f", "s16le", "-",
+    ]
+
+
+def read_pcm_wav(media_path):
+    """Reads a WAV that is already 16 kHz mono PCM without ffmpeg, else returns None."""
+    try:
+        with wave.open(media_path, "rb") as wf:
+            if wf.getnchannels() != 1 or wf.getsampwidth() != 2 or wf.getframerate() != SAMPLE_RATE:
+                return None
+            frames = wf.readframes(wf.getnframes())
+    except (wave.Error, EOFError):
+        return None
+    return np.frombuffer(frames, np.int16).astype(np.float32) / 32768.0
+
+
+def load_audio_pcm(media_path, max_seconds=None):
+    """Decodes the audio track straight into a float32 NumPy array Whisper accepts."""
+    if media_path.lower().endswith(".wav"):
+        audio = read_pcm_wav(media_path)
+        if audio is not None:
+            return audio[:int(max_seconds * SAMPLE_RATE)] if max_seconds else audio
+    result = subprocess.run(ffmpeg_pcm_command(media_path, max_seconds), capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.decode(errors='ignore').strip()}")
+    return np.frombuffer(result.stdout, np.int16).astype(np.float32) / 32768.0
+
+
+def iter_pcm_chunks(media_path, chunk_bytes=8000):
+    """Yields raw PCM chunks from ffmpeg as they are decoded."""
+    proc = subprocess.Popen(ffmpeg_pcm_command(media_path), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            data = proc.stdout.read(chunk_bytes)
+            if not data:
+                break
+            yield data
+    finally:
+        proc.stdout.close()
+        proc.wait()
+
+
+def vosk_segment(res):
+    """One Vosk utterance as a timed segment (word timings need SetWords(True))."""
+    words = res.get("result") or []
+    if not words or not res.get("text"):
+        return None
+    return {
+        "start": words[0]["start"],
+        "end": words[-1]["end"],
+        "text": res["text"],
+        "confidence": sum(w.get("conf", 1.0) for w in words) / len(words),
+    }
+
+
+def transcribe_vosk_stream(media_path, model_path, return_segments=False):
+    if not os.path.exists(model_path):
+        print(f"Vosk model path not found: {model_path}")
+        return ("", []) if return_segments else ""
+
+    recognizer = KaldiRecognizer(get_vosk_model(model_path), SAMPLE_RATE)
+    recognizer.SetWords(True)
+    text, segments = "", []
+    for data in iter_pcm_chunks(media_path):
+        if recognizer.AcceptWaveform(data):
+            res = json.loads(recognizer.Result())
+            text += res.get("text", "") + " "
+            segments.append(vosk_segment(res))
+
+    res = json.loads(recognizer.FinalResult())
+    text += res.get("text", "")
+    segments.append(vosk_segment(res))
+    segments = [segment for segment in segments if segment]
+    return (text, segments) if return_segments else text
+
+
 # -------------------------
 # RECURSIVE VIDEO SCAN
 # -------------------------
@@ -118,71 +337,1225 @@ def get_all_video_files(root_dir):
     return video_files
 
 
+def get_all_media_files(root_dir):
+    """Videos plus the voice notes / audio files the scraper saves under Audios."""
+    media_files = []
+    for root, dirs, files in os.walk(root_dir):
+        for file in files:
+            if file.lower().endswith(VIDEO_EXTENSIONS + AUDIO_EXTENSIONS):
+                media_files.append(os.path.join(root, file))
+    return media_files
+
+
 # -------------------------
-# MAIN PROCESSING
+# SAVE OUTPUT ATOMICALLY
 # -------------------------
-if len(sys.argv) > 1:
-    videos_dir = sys.argv[1]
-else:
-    videos_dir = os.path.join(base_dir, "data_files", "Database")
+def write_atomic(path, text):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
 
-transcription_folder = os.path.join(videos_dir, "Transcription")
-os.makedirs(transcription_folder, exist_ok=True)
 
-vosk_model_path = r"C:\\Users\\Ashutosh Mishra\\Desktop\\STUDY\\Coding\\vosk-model-en-us-0.22"
+# -------------------------
+# TRANSCRIPTION MANIFEST (transcription.db)
+# -------------------------
+# One row per input file. A file is skipped when its size and mtime (or, if only
+# the mtime changed, its content hash) match the row and the output still exists.
+def open_manifest(db_path):
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS transcriptions (
+            path TEXT PRIMARY KEY,
+            size INTEGER,
+            mtime REAL,
+            sha256 TEXT,
+            model TEXT,
+            language TEXT,
+            output_path TEXT,
+            transcribed_at TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_transcriptions_sha256 ON transcriptions (sha256)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_transcriptions_output ON transcriptions (output_path)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS segments (
+            video TEXT NOT NULL,
+            start REAL NOT NULL,
+            end REAL NOT NULL,
+            text TEXT NOT NULL,
+            language TEXT,
+            confidence REAL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_segments_video_start ON segments (video, start)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_segments_start ON segments (start)")
+    conn.commit()
+    return conn
 
-video_files = get_all_video_files(videos_dir)
-print(f"Found {len(video_files)} video files to process.\n")
 
-for video_path in video_files:
-    file_name = os.path.splitext(os.path.basename(video_path))[0]
-    print(f"\n==============================")
-    print(f"Processing: {file_name}")
-    print("==============================")
+def file_sha256(path, block_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def is_already_transcribed(conn, path):
+    row = conn.execute(
+        "SELECT size, mtime, sha256, output_path FROM transcriptions WHERE path = ?",
+        (os.path.abspath(path),),
+    ).fetchone()
+    if not row:
+        return False
+    size, mtime, sha256, output_path = row
+    if not output_path or not os.path.exists(output_path) or output_shared(conn, output_path):
+        return False
+    stat = os.stat(path)
+    if stat.st_size != size:
+        return False
+    if stat.st_mtime == mtime:
+        return True
+    # Touched but maybe not changed (copied, restored from backup...)
+    if file_sha256(path) != sha256:
+        return False
+    conn.execute("UPDATE transcriptions SET mtime = ? WHERE path = ?", (stat.st_mtime, os.path.abspath(path)))
+    conn.commit()
+    return True
+
+
+def output_shared(conn, output_path):
+    """True when several files were written to the same transcript (names used to be the
+    bare file name, which repeats across chats): it only holds the last one's text."""
+    count = conn.execute("SELECT COUNT(*) FROM transcriptions WHERE output_path = ?", (output_path,)).fetchone()[0]
+    return count > 1
+
+
+def record_transcription(conn, result):
+    if not result.get("output"):
+        return
+    path = result["video"]
+    stat = os.stat(path)
+    conn.execute(
+        "INSERT OR REPLACE INTO transcriptions VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            os.path.abspath(path),
+            stat.st_size,
+            stat.st_mtime,
+            result.get("sha256") or file_sha256(path),
+            result.get("model"),
+            result.get("language"),
+            os.path.abspath(result["output"]),
+            datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        ),
+    )
+    conn.commit()
+
+
+# -------------------------
+# SEGMENT STORE
+# -------------------------
+# Timed segments of every transcript (in the language of the saved transcript, i.e.
+# English for translations; language is the detected source language). Start/end
+# are seconds from the beginning of the file, so a hit can be opened at that point.
+def segment_confidence(segment):
+    if segment.get("confidence") is not None:
+        return segment["confidence"]
+    if segment.get("avg_logprob") is not None:
+        return math.exp(segment["avg_logprob"])
+    return None
+
+
+def store_segments(conn, video_path, segments, language):
+    video = os.path.abspath(video_path)
+    conn.execute("DELETE FROM segments WHERE video = ?", (video,))
+    conn.executemany(
+        "INSERT INTO segments VALUES (?, ?, ?, ?, ?, ?)",
+        [
+            (video, segment["start"], segment["end"], segment["text"].strip(), language,
+             segment_confidence(segment))
+            for segment in segments if segment["text"].strip()
+        ],
+    )
+    conn.commit()
+
+
+def copy_segments(conn, source_path, video_path):
+    video = os.path.abspath(video_path)
+    conn.execute("DELETE FROM segments WHERE video = ?", (video,))
+    conn.execute(
+        "INSERT INTO segments SELECT ?, start, end, text, language, confidence FROM segments WHERE video = ?",
+        (video, os.path.abspath(source_path)),
+    )
+    conn.commit()
+
+
+def search_segments(conn, query, video=None, start=None, end=None, min_confidence=None, limit=50):
+    """Segments whose text contains query (case-insensitive), optionally within one
+    video and a time window; returns dicts with video, start, end, text, language, confidence."""
+    sql = "SELECT video, start, end, text, language, confidence FROM segments WHERE text LIKE ? ESCAPE '\\'"
+    params = ["%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"]
+    if video:
+        sql += " AND video = ?"
+        params.append(os.path.abspath(video))
+    if start is not None:
+        sql += " AND end >= ?"
+        params.append(start)
+    if end is not None:
+        sql += " AND start <= ?"
+        params.append(end)
+    if min_confidence is not None:
+        sql += " AND confidence >= ?"
+        params.append(min_confidence)
+    sql += " ORDER BY video, start LIMIT ?"
+    params.append(limit)
+    columns = ["video", "start", "end", "text", "language", "confidence"]
+    return [dict(zip(columns, row)) for row in conn.execute(sql, params)]
+
+
+def format_offset(seconds):
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}"
+
+
+def find_transcribed_copy(conn, sha256):
+    """Returns (path, output_path, language, model) of an earlier transcription of the same bytes."""
+    for path, output_path, language, model in conn.execute(
+        "SELECT path, output_path, language, model FROM transcriptions WHERE sha256 = ? ORDER BY transcribed_at DESC",
+        (sha256,),
+    ):
+        if output_path and os.path.exists(output_path) and not output_shared(conn, output_path):
+            return path, output_path, language, model
+    return None
+
+
+# -------------------------
+# DUPLICATE DETECTION
+# -------------------------
+# The same clip gets forwarded into many chats. Copies are found by size, then
+# sha256 (byte-identical forwards), and with --dedup audio also by a short audio
+# fingerprint (re-uploads Telegram re-encoded). Each unique clip is transcribed
+# once and its transcript is copied next to every duplicate.
+FINGERPRINT_SECONDS = 30
+FINGERPRINT_FRAME_SECONDS = 0.25
+FINGERPRINT_MAX_DISTANCE = 0.15  # fraction of differing bits still counted as the same clip
+DURATION_TOLERANCE_SECONDS = 1.0
+
+
+def audio_fingerprint(media_path):
+    """Rising/falling loudness between 250 ms frames of the first 30 s, as a bit array."""
+    try:
+        audio = load_audio_pcm(media_path, max_seconds=FINGERPRINT_SECONDS)
+    except RuntimeError:
+        return None
+    frame = int(SAMPLE_RATE * FINGERPRINT_FRAME_SECONDS)
+    count = len(audio) // frame
+    if count < 16:
+        return None
+    energy = np.log1p((audio[:count * frame].reshape(count, frame) ** 2).sum(axis=1))
+    return energy[1:] > energy[:-1]
+
+
+def fingerprints_match(a, b):
+    length = min(len(a), len(b))
+    if length == 0 or abs(len(a) - len(b)) > 4:
+        return False
+    return np.count_nonzero(a[:length] != b[:length]) / length <= FINGERPRINT_MAX_DISTANCE
+
+
+def group_by_audio(paths):
+    """Groups files whose audio fingerprints match; only files of the same length are compared."""
+    durations = {p: probe_duration(p) for p in paths}
+    ordered = sorted((d, p) for p, d in durations.items() if d is not None)
+    fingerprints, groups = {}, {}
+    for i, (duration, path) in enumerate(ordered):
+        leader = None
+        for other_duration, other in reversed(ordered[:i]):
+            if duration - other_duration > DURATION_TOLERANCE_SECONDS:
+                break
+            if other not in groups:
+                continue
+            for p in (path, other):
+                if p not in fingerprints:
+                    fingerprints[p] = audio_fingerprint(p)
+            if fingerprints[path] is not None and fingerprints[other] is not None \
+                    and fingerprints_match(fingerprints[path], fingerprints[other]):
+                leader = other
+                break
+        if leader:
+            groups[leader].append(path)
+        else:
+            groups[path] = [path]
+    for path in paths:
+        if durations.get(path) is None:
+            groups[path] = [path]
+    return list(groups.values())
+
+
+def find_duplicates(conn, paths, mode="hash", reuse=True):
+    """Splits paths into clips to transcribe and copies of them.
 
-    # Extract audio
-    audio_path = os.path.join(transcription_folder, file_name + ".wav")
-    extract_audio(video_path, audio_path)
+    Returns (unique, duplicates, known, hashes): duplicates maps a path to be transcribed to
+    its copies, known maps a path to an earlier transcription (path, output, language, model) of
+    the same bytes found in the manifest (unless reuse is off), hashes caches the sha256 of
+    every hashed file.
+    """
+    if mode == "none":
+        return list(paths), {}, {}, {}
+    by_size = {}
+    for path in paths:
+        by_size.setdefault(os.path.getsize(path), []).append(path)
 
+    hashes, known, unique, duplicates = {}, {}, [], {}
+    for same_size in by_size.values():
+        by_hash = {}
+        for path in same_size:
+            hashes[path] = file_sha256(path)
+            by_hash.setdefault(hashes[path], []).append(path)
+        for sha256, copies in by_hash.items():
+            previous = find_transcribed_copy(conn, sha256) if reuse else None
+            if previous:
+                for path in copies:
+                    known[path] = previous
+                continue
+            unique.append(copies[0])
+            if len(copies) > 1:
+                duplicates[copies[0]] = copies[1:]
+
+    if mode == "audio" and len(unique) > 1:
+        grouped = []
+        for group in group_by_audio(unique):
+            grouped.append(group[0])
+            for path in group[1:]:
+                duplicates.setdefault(group[0], []).extend([path] + duplicates.pop(path, []))
+        unique = grouped
+    return unique, duplicates, known, hashes
+
+
+def copy_transcription(source_output, video_path, options):
+    """Writes the transcript source_output for its duplicate video_path, keeping the suffix."""
+    output_name = os.path.basename(source_output)
+    if output_name.endswith("_transcription_english.txt"):
+        suffix = "_transcription_english.txt"
+    else:
+        suffix = "_transcription.txt"
+    file_name = transcript_stem(video_path, options)
+    output_file = os.path.join(options["transcription_folder"], file_name + suffix)
+    if os.path.abspath(output_file) != os.path.abspath(source_output):
+        with open(source_output, "r", encoding="utf-8") as f:
+            write_atomic(output_file, f.read())
+    return output_file
+
+
+# -------------------------
+# PROCESS ONE VIDEO
+# -------------------------
+def transcribe_two_pass(audio, video_path, vosk_model_path):
+    """Transcribe, detect language on the text, re-run as translation if not English."""
     # Transcription - Whisper preferred
-    transcription = transcribe_whisper(audio_path)
+    transcription, segments = transcribe_whisper(audio, return_segments=True)
+    model_used = "whisper:base"
 
-    # Vosk fallback
+    # Vosk fallback (streams PCM chunks from ffmpeg)
     if not transcription.strip():
         print("Whisper failed or returned empty. Using Vosk...")
-        transcription = transcribe_vosk(audio_path, vosk_model_path)
+        transcription, segments = transcribe_vosk_stream(video_path, vosk_model_path, return_segments=True)
+        model_used = "vosk"
 
     if not transcription.strip():
-        print("No transcription available.")
-        continue
+        return None, "", None, []
 
     # Detect language
     print("Detecting language...")
     detected_lang = detect_language(transcription)
     print(f"Detected language: {detected_lang}")
 
+    # CASE 1: Already English → keep the transcription
+    if detected_lang == "en":
+        print("Language is English → saving without translation.")
+        return detected_lang, transcription, model_used, segments
+
+    # CASE 2: Not English → Translate
+    print("Non-English detected → translating to English...")
+    text, segments = translate_to_english(audio, return_segments=True)
+    return detected_lang, text, "whisper:small", segments
+
+
+def transcribe_single_pass(audio, video_path, vosk_model_path, detected_lang=None):
+    """Detect language on the audio prefix, then exactly one full decode."""
+    if detected_lang is None:
+        print("Detecting language from audio...")
+        detected_lang, probability = detect_language_from_audio(audio)
+        print(f"Detected language: {detected_lang} ({probability:.0%})")
+
+    if detected_lang == "en":
+        print("Language is English → transcribing.")
+        (text, segments), model_used = transcribe_whisper(audio, language="en", return_segments=True), "whisper:base"
+        if not text.strip():
+            print("Whisper failed or returned empty. Using Vosk...")
+            (text, segments), model_used = transcribe_vosk_stream(video_path, vosk_model_path, True), "vosk"
+    else:
+        print("Non-English detected → translating to English...")
+        (text, segments), model_used = (
+            translate_to_english(audio, language=detected_lang, return_segments=True), "whisper:small"
+        )
+
+    if not text.strip():
+        return None, "", None, []
+    return detected_lang, text, model_used, segments
+
+
+# -------------------------
+# TRANSCRIPTION BACKENDS
+# -------------------------
+# "whisper" is the stock openai-whisper flow above. "faster-whisper" runs the same
+# models through CTranslate2 with int8 weights on the CPU. "vosk" streams into the
+# (English) Vosk model. "auto" picks one per file from language and duration.
+BACKENDS = ["whisper", "faster-whisper", "vosk", "auto"]
+VOSK_MIN_SECONDS = 600  # auto: long English recordings go to Vosk when faster-whisper is missing
+
+
+def get_faster_whisper_model(name):
+    return get_model(
+        f"faster-whisper:{name}",
+        lambda: WhisperModel(name, device="cpu", compute_type="int8"),
+    )
+
+
+def detect_language_fast(audio):
+    """Language of the first 30 s, with the int8 engine when it is installed."""
+    if not FASTER_WHISPER_AVAILABLE:
+        return detect_language_from_audio(audio)
+    # Language detection runs eagerly; the segment generator is never consumed
+    _, info = get_faster_whisper_model("base").transcribe(audio[:30 * SAMPLE_RATE])
+    return info.language, info.language_probability
+
+
+def transcribe_faster_whisper(audio, detected_lang=None):
+    """One full pass: transcribe English with "base", translate anything else with "small"."""
+    if detected_lang is None:
+        detected_lang, probability = detect_language_fast(audio)
+        print(f"Detected language: {detected_lang} ({probability:.0%})")
+    if detected_lang == "en":
+        model_name, task = "base", "transcribe"
+    else:
+        model_name, task = "small", "translate"
+    try:
+        segments, _ = get_faster_whisper_model(model_name).transcribe(audio, task=task, language=detected_lang)
+        segments = faster_whisper_segments(segments)
+        text = "".join(segment["text"] for segment in segments)
+    except Exception as e:
+        print(f"faster-whisper failed: {e}")
+        return None, "", None, []
+    if not text.strip():
+        return None, "", None, []
+    return detected_lang, text, f"faster-whisper:{model_name}", segments
+
+
+def faster_whisper_segments(segments, offset=0.0):
+    return [
+        {
+            "start": offset + segment.start,
+            "end": offset + segment.end,
+            "text": segment.text,
+            "avg_logprob": segment.avg_logprob,
+        }
+        for segment in segments
+    ]
+
+
+# Batched voice notes and chunks of long recordings are transcribed from in-memory
+# arrays, one model call each, so they use an engine rather than a per-file backend:
+# faster-whisper when --backend asks for it (or auto picks it), stock Whisper otherwise.
+# Vosk is only used for whole files.
+def array_engine(options):
+    backend = options["backend"]
+    if backend == "faster-whisper":
+        return "faster-whisper"
+    if backend == "auto" and choose_backend(None, 0, options["vosk_model_path"]) == "faster-whisper":
+        return "faster-whisper"
+    return "whisper"
+
+
+def engine_model_name(engine, task):
+    model_name = "small" if task == "translate" else "base"
+    return model_name, f"{engine}:{model_name}"
+
+
+def transcribe_array(audio, task, language, engine, offset=0.0, condition_on_previous_text=True):
+    """Timed segments of one model call on audio with the given engine."""
+    model_name, _ = engine_model_name(engine, task)
+    if engine == "faster-whisper":
+        segments, _ = get_faster_whisper_model(model_name).transcribe(
+            audio, task=task, language=language, condition_on_previous_text=condition_on_previous_text,
+        )
+        return faster_whisper_segments(segments, offset)
+    result = get_whisper_model(model_name).transcribe(
+        audio, task=task, language=language, condition_on_previous_text=condition_on_previous_text,
+    )
+    return whisper_segments(result, offset)
+
+
+def detect_language_with(engine, audio):
+    if engine == "faster-whisper":
+        return detect_language_fast(audio)
+    return detect_language_from_audio(audio)
+
+
+def choose_backend(language, duration, vosk_model_path):
+    import torch
+    if torch.cuda.is_available():
+        return "whisper"
+    if language == "en" and duration >= VOSK_MIN_SECONDS and not FASTER_WHISPER_AVAILABLE \
+            and os.path.exists(vosk_model_path):
+        return "vosk"
+    if FASTER_WHISPER_AVAILABLE:
+        return "faster-whisper"
+    return "whisper"
+
+
+def transcribe_with_backend(audio, video_path, options):
+    backend, detected_lang = options["backend"], None
+    if backend == "auto":
+        detected_lang, probability = detect_language_fast(audio)
+        print(f"Detected language: {detected_lang} ({probability:.0%})")
+        backend = choose_backend(detected_lang, len(audio) / SAMPLE_RATE, options["vosk_model_path"])
+        print(f"Backend: {backend}")
+
+    if backend == "faster-whisper":
+        return transcribe_faster_whisper(audio, detected_lang)
+    if backend == "vosk":
+        text, segments = transcribe_vosk_stream(video_path, options["vosk_model_path"], return_segments=True)
+        # The Vosk model is English-only, so its output is saved as English
+        return ("en", text, "vosk", segments) if text.strip() else (None, "", None, [])
+    return transcribe_single_pass(audio, video_path, options["vosk_model_path"], detected_lang)
+
+
+def process_video(video_path, options, audio=None):
+    file_name = os.path.splitext(os.path.basename(video_path))[0]
+    print(f"\n==============================")
+    print(f"Processing: {file_name}")
+    print("==============================")
+    failed = {"video": video_path, "output": None, "language": None, "model": None}
+
+    # Decode audio into memory (no temp WAV on disk)
+    if audio is None:
+        try:
+            audio = load_audio_pcm(video_path)
+        except Exception as e:
+            print(f"Audio decoding failed: {e}")
+            return failed
+
+    if len(audio) > options["long_seconds"] * SAMPLE_RATE:
+        return process_long_recording(video_path, audio, options)
+
+    if options["backend"] != "whisper":
+        detected_lang, final_text, model_used, segments = transcribe_with_backend(audio, video_path, options)
+    elif options["lang_detect"] == "audio":
+        detected_lang, final_text, model_used, segments = transcribe_single_pass(
+            audio, video_path, options["vosk_model_path"]
+        )
+    else:
+        detected_lang, final_text, model_used, segments = transcribe_two_pass(
+            audio, video_path, options["vosk_model_path"]
+        )
+
+    if not final_text.strip():
+        print("No transcription available.")
+        return failed
+
     # -------------------------
     # SAVE ONLY ONE FILE
     # -------------------------
+    # English → <name>_transcription.txt, otherwise ONLY the translated <name>_transcription_english.txt
+    return save_transcription(video_path, options, detected_lang, final_text, model_used, segments)
 
-    # CASE 1: Already English → Save as <name>_transcription.txt
-    if detected_lang == "en":
-        output_file = os.path.join(transcription_folder, file_name + "_transcription.txt")
-        final_text = transcription
-        print("Language is English → saving without translation.")
 
-    # CASE 2: Not English → Translate → Save ONLY translated file
+def transcript_stem(video_path, options):
+    """Output name for video_path: its path under videos_dir with the separators flattened,
+    since Telegram message ids (the file names) repeat across chats and dates."""
+    try:
+        relative = os.path.relpath(os.path.abspath(video_path), os.path.abspath(options["videos_dir"]))
+    except ValueError:  # another drive on Windows
+        relative = os.pardir
+    if relative.startswith(os.pardir):
+        folder = hashlib.sha1(os.path.dirname(os.path.abspath(video_path)).encode("utf-8")).hexdigest()[:8]
+        relative = os.path.join(folder, os.path.basename(video_path))
+    return os.path.splitext(relative)[0].replace(os.sep, "_").replace("/", "_")
+
+
+def save_transcription(video_path, options, detected_lang, final_text, model_used, segments=None):
+    file_name = transcript_stem(video_path, options)
+    suffix = "_transcription.txt" if detected_lang == "en" else "_transcription_english.txt"
+    output_file = os.path.join(options["transcription_folder"], file_name + suffix)
+    write_atomic(output_file, format_transcription(final_text))
+    return {"video": video_path, "output": output_file, "language": detected_lang, "model": model_used,
+            "segments": segments or []}
+
+
+# -------------------------
+# BATCHED SHORT CLIPS (VOICE NOTES)
+# -------------------------
+# Short clips are packed one after another (with a second of silence between them)
+# into a single Whisper window, transcribed in one call, and each segment is handed
+# back to the clip its midpoint falls in.
+VOICE_NOTE_MAX_BYTES = 512 * 1024  # files this small are candidates for batching
+SHORT_CLIP_SECONDS = 20
+PACK_SECONDS = 30
+PACK_GAP_SECONDS = 1.0
+
+
+def pack_clips(clips):
+    packs, current, length = [], [], 0.0
+    for path, audio in clips:
+        duration = len(audio) / SAMPLE_RATE + PACK_GAP_SECONDS
+        if current and length + duration > PACK_SECONDS:
+            packs.append(current)
+            current, length = [], 0.0
+        current.append((path, audio))
+        length += duration
+    if current:
+        packs.append(current)
+    return packs
+
+
+def transcribe_packed(pack, task="transcribe", language=None, engine="whisper"):
+    gap = np.zeros(int(PACK_GAP_SECONDS * SAMPLE_RATE), np.float32)
+    pieces, spans, pos = [], [], 0
+    for _, audio in pack:
+        spans.append((pos / SAMPLE_RATE, (pos + len(audio)) / SAMPLE_RATE))
+        pieces += [audio, gap]
+        pos += len(audio) + len(gap)
+
+    packed_segments = transcribe_array(
+        np.concatenate(pieces), task, language, engine,
+        condition_on_previous_text=False,  # don't let one clip's text steer the next
+    )
+
+    texts, segments = [""] * len(pack), [[] for _ in pack]
+    for segment in packed_segments:
+        mid = (segment["start"] + segment["end"]) / 2
+        index = min(range(len(spans)), key=lambda i: 0 if spans[i][0] <= mid <= spans[i][1]
+                    else min(abs(mid - spans[i][0]), abs(mid - spans[i][1])))
+        texts[index] += segment["text"]
+        # Times relative to the start of the clip itself
+        start, end = spans[index]
+        segments[index].append({
+            **segment,
+            "start": min(max(segment["start"] - start, 0.0), end - start),
+            "end": min(max(segment["end"] - start, 0.0), end - start),
+        })
+    return texts, segments
+
+
+def translate_clip(audio, engine):
+    """(text, segments) of one clip translated to English; empty if the model fails."""
+    try:
+        segments = transcribe_array(audio, "translate", None, engine)
+    except Exception as e:
+        print(f"Translation failed: {e}")
+        return "", []
+    return "".join(segment["text"] for segment in segments), segments
+
+
+def process_clip_batch(paths, options):
+    print(f"\nBatching {len(paths)} short clips")
+    engine = array_engine(options)
+    results, clips = [], []
+    for path in paths:
+        try:
+            audio = load_audio_pcm(path)
+        except Exception as e:
+            print(f"Audio decoding failed for {path}: {e}")
+            results.append({"video": path, "output": None, "language": None, "model": None})
+            continue
+        if len(audio) > SHORT_CLIP_SECONDS * SAMPLE_RATE:
+            results.append(process_video(path, options, audio=audio))
+        else:
+            clips.append((path, audio))
+
+    if options["lang_detect"] == "audio":
+        # Detect per clip, then one translate/transcribe call per language pack
+        by_language = {}
+        for path, audio in clips:
+            language, _ = detect_language_with(engine, audio)
+            by_language.setdefault(language, []).append((path, audio))
+        for language, lang_clips in by_language.items():
+            task = "transcribe" if language == "en" else "translate"
+            _, model_used = engine_model_name(engine, task)
+            for pack in pack_clips(lang_clips):
+                texts, segments = transcribe_packed(pack, task, language, engine)
+                for (path, _), text, clip_segments in zip(pack, texts, segments):
+                    results.append(save_transcription(path, options, language, text, model_used, clip_segments)
+                                   if text.strip()
+                                   else {"video": path, "output": None, "language": None, "model": None})
+        return results
+
+    for pack in pack_clips(clips):
+        texts, segments = transcribe_packed(pack, engine=engine)
+        for (path, audio), text, clip_segments in zip(pack, texts, segments):
+            if not text.strip():
+                results.append({"video": path, "output": None, "language": None, "model": None})
+                continue
+            language = detect_language(text)
+            if language == "en":
+                _, model_used = engine_model_name(engine, "transcribe")
+                results.append(save_transcription(path, options, language, text, model_used, clip_segments))
+            else:
+                translation, clip_segments = translate_clip(audio, engine)
+                _, model_used = engine_model_name(engine, "translate")
+                results.append(save_transcription(path, options, language, translation, model_used, clip_segments)
+                               if translation.strip()
+                               else {"video": path, "output": None, "language": None, "model": None})
+    return results
+
+
+def build_jobs(media_files, batch_size):
+    """One job per video/long file; small audio files grouped batch_size at a time."""
+    jobs, voice_notes = [], []
+    for path in media_files:
+        if batch_size > 1 and is_audio_file(path) and os.path.getsize(path) <= VOICE_NOTE_MAX_BYTES:
+            voice_notes.append(path)
+        else:
+            jobs.append([path])
+    jobs += [voice_notes[i:i + batch_size] for i in range(0, len(voice_notes), batch_size)]
+    return jobs
+
+
+def process_job(paths, options, audio=None):
+    if len(paths) == 1:
+        return [process_video(paths[0], options, audio)]
+    return process_clip_batch(paths, options)
+
+
+def process_job_safely(paths, options, audio=None):
+    """process_job, but a bad file or a model error fails only this job, not the run."""
+    try:
+        return process_job(paths, options, audio)
+    except Exception as e:
+        print(f"Failed to process {paths}: {e}")
+        return [{"video": path, "output": None, "language": None, "model": None} for path in paths]
+
+
+# -------------------------
+# PIPELINED DECODING
+# -------------------------
+# ffmpeg decoder threads work ahead on upcoming files while the model transcribes
+# the current one. At most `prefetch` decoded files wait in memory; decoders block
+# (backpressure) until the model catches up.
+def iter_decoded(jobs, decoders=1, prefetch=2):
+    """Yields (job, audio) as decoding finishes; audio is None for batched jobs
+    (they decode their own small clips) or the exception if decoding failed."""
+    todo = queue.Queue()
+    for job in jobs:
+        todo.put(job)
+    ready = queue.Queue(maxsize=prefetch)
+
+    def decode():
+        while True:
+            try:
+                job = todo.get_nowait()
+            except queue.Empty:
+                break
+            audio = None
+            if len(job) == 1:
+                try:
+                    audio = load_audio_pcm(job[0])
+                except Exception as e:
+                    audio = e
+            ready.put((job, audio))
+        ready.put(None)
+
+    for _ in range(decoders):
+        threading.Thread(target=decode, daemon=True).start()
+
+    finished = 0
+    while finished < decoders:
+        item = ready.get()
+        if item is None:
+            finished += 1
+            continue
+        yield item
+
+
+def run_pipelined(jobs, options, decoders, prefetch):
+    for job, audio in iter_decoded(jobs, decoders, prefetch):
+        if isinstance(audio, Exception):
+            print(f"Audio decoding failed for {job[0]}: {audio}")
+            yield {"video": job[0], "output": None, "language": None, "model": None}
+            continue
+        yield from process_job_safely(job, options, audio)
+
+
+# -------------------------
+# LONG RECORDINGS: VAD SEGMENTATION + PARALLEL CHUNKS
+# -------------------------
+# Silence is found with a simple energy VAD and dropped; speech is grouped into
+# chunks of at most chunk_seconds that are transcribed independently (in a pool
+# when one is given) and stitched back with their original timestamps. Finished
+# chunks are kept in <name>.chunks/ so a crash only loses the chunk in flight.
+# Lowest bitrates worth expecting, so only files big enough to run past long_seconds
+# are probed for their duration up front (voice Opus goes down to ~6 kbit/s)
+MIN_AUDIO_BYTES_PER_SECOND = 6000 // 8
+MIN_VIDEO_BYTES_PER_SECOND = 100000 // 8
+VAD_FRAME_MS = 30
+VAD_MIN_SILENCE_MS = 600
+VAD_PAD_MS = 200
+CHUNK_MAX_GAP_SECONDS = 2.0
+
+
+def probe_duration(media_path):
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", media_path],
+        capture_output=True, text=True,
+    )
+    try:
+        return float(result.stdout.strip())
+    except ValueError:
+        return None
+
+
+def is_long_recording(media_path, long_seconds):
+    per_second = MIN_AUDIO_BYTES_PER_SECOND if is_audio_file(media_path) else MIN_VIDEO_BYTES_PER_SECOND
+    if os.path.getsize(media_path) < long_seconds * per_second:
+        return False
+    return (probe_duration(media_path) or 0) > long_seconds
+
+
+def find_speech_regions(audio):
+    """Returns (start, end) sample ranges that contain speech."""
+    frame = SAMPLE_RATE * VAD_FRAME_MS // 1000
+    count = len(audio) // frame
+    if count == 0:
+        return []
+    rms = np.sqrt(np.mean(audio[:count * frame].reshape(count, frame) ** 2, axis=1))
+    # Above the noise floor, but never above a quarter of the loud (speech) level,
+    # which matters when there is hardly any silence to estimate the floor from
+    noise_floor, speech_level = np.percentile(rms, [10, 95])
+    threshold = max(min(noise_floor * 3, speech_level * 0.25), 1e-3)
+    speech = rms > threshold
+    min_silence = VAD_MIN_SILENCE_MS // VAD_FRAME_MS
+    pad = VAD_PAD_MS // VAD_FRAME_MS
+
+    regions, start, last = [], None, 0
+    for i, is_speech in enumerate(speech):
+        if is_speech:
+            if start is None:
+                start = i
+            last = i
+        elif start is not None and i - last > min_silence:
+            regions.append((start, last + 1))
+            start = None
+    if start is not None:
+        regions.append((start, last + 1))
+    return [(max(0, a - pad) * frame, min(len(audio), (b + pad) * frame)) for a, b in regions]
+
+
+def split_into_chunks(regions, chunk_seconds):
+    """Groups speech regions into chunks no longer than chunk_seconds, splitting at silences."""
+    max_len = int(chunk_seconds * SAMPLE_RATE)
+    max_gap = int(CHUNK_MAX_GAP_SECONDS * SAMPLE_RATE)
+    chunks, current = [], None
+    for a, b in regions:
+        if current and a - current[1] <= max_gap and b - current[0] <= max_len:
+            current = (current[0], b)
+            continue
+        if current:
+            chunks.append(current)
+        while b - a > max_len:  # one very long stretch of speech
+            chunks.append((a, a + max_len))
+            a += max_len
+        current = (a, b)
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _transcribe_chunk(job):
+    index, offset, audio, task, language, engine = job
+    return index, transcribe_array(audio, task, language, engine, offset)
+
+
+def process_long_recording(video_path, audio, options, pool=None):
+    file_name = transcript_stem(video_path, options)
+    failed = {"video": video_path, "output": None, "language": None, "model": None}
+
+    chunks = split_into_chunks(find_speech_regions(audio), options["chunk_seconds"])
+    speech_seconds = sum(b - a for a, b in chunks) / SAMPLE_RATE
+    print(f"Long recording: {len(audio) / SAMPLE_RATE:.0f}s, {speech_seconds:.0f}s of speech in {len(chunks)} chunks")
+    if not chunks:
+        print("No speech found.")
+        return failed
+
+    # One language for the whole file, from the first speech
+    engine = array_engine(options)
+    detected_lang, _ = detect_language_with(engine, audio[chunks[0][0]:])
+    print(f"Detected language: {detected_lang}")
+    task = "transcribe" if detected_lang == "en" else "translate"
+
+    chunk_dir = os.path.join(options["transcription_folder"], file_name + ".chunks")
+    os.makedirs(chunk_dir, exist_ok=True)
+    done = {}
+    for index, (a, b) in enumerate(chunks):
+        chunk_file = os.path.join(chunk_dir, f"{index:05d}.json")
+        if os.path.exists(chunk_file):
+            with open(chunk_file, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            if (saved["start"], saved["end"], saved["task"], saved.get("engine", "whisper")) == (a, b, task, engine):
+                done[index] = saved["segments"]
+    if done:
+        print(f"Resuming: {len(done)}/{len(chunks)} chunks already transcribed")
+
+    todo = [
+        (index, a / SAMPLE_RATE, audio[a:b], task, detected_lang, engine)
+        for index, (a, b) in enumerate(chunks) if index not in done
+    ]
+    results = pool.imap_unordered(_transcribe_chunk, todo) if pool else map(_transcribe_chunk, todo)
+    for index, segments in results:
+        a, b = chunks[index]
+        write_atomic(
+            os.path.join(chunk_dir, f"{index:05d}.json"),
+            json.dumps({"start": a, "end": b, "task": task, "engine": engine, "segments": segments}),
+        )
+        done[index] = segments
+        print(f"Chunk {len(done)}/{len(chunks)} done")
+
+    segments = [segment for index in sorted(done) for segment in done[index]]
+    final_text = " ".join(segment["text"].strip() for segment in segments)
+    if not final_text.strip():
+        print("No transcription available.")
+        return failed
+
+    _, model_used = engine_model_name(engine, task)
+    result = save_transcription(video_path, options, detected_lang, final_text, model_used, segments)
+    shutil.rmtree(chunk_dir, ignore_errors=True)
+    return result
+
+
+def run_long_recordings(long_files, options, chunk_workers, torch_threads):
+    """Long files one at a time, each spread over a pool of chunk workers."""
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(processes=chunk_workers, initializer=_init_worker, initargs=(torch_threads, options)) as pool:
+        for path in long_files:
+            print(f"\n==============================")
+            print(f"Processing (chunked): {os.path.basename(path)}")
+            print("==============================")
+            try:
+                yield process_long_recording(path, load_audio_pcm(path), options, pool)
+            except Exception as e:
+                print(f"Failed to process {path}: {e}")
+
+
+# -------------------------
+# WORKER POOL
+# -------------------------
+# Each worker process keeps its own resident models (see MODEL REGISTRY) and
+# pulls the next video as soon as it is free.
+_worker_options = {}
+
+
+def _init_worker(torch_threads, options):
+    if torch_threads:
+        import torch
+        torch.set_num_threads(torch_threads)
+    _worker_options.update(options)
+
+
+def _process_in_worker(paths):
+    return process_job_safely(paths, _worker_options)
+
+
+def run_pool(jobs, options, workers, torch_threads):
+    ctx = multiprocessing.get_context("spawn")  # fork + torch threads don't mix
+    with ctx.Pool(
+        processes=workers,
+        initializer=_init_worker,
+        initargs=(torch_threads, options),
+    ) as pool:
+        for results in pool.imap_unordered(_process_in_worker, jobs, chunksize=1):
+            yield from results
+
+
+# -------------------------
+# WATCH MODE
+# -------------------------
+# New files are picked up as they land instead of on a second pass over the tree:
+# either from the scraper's FILE_DONE:<path> lines on stdin, or from filesystem
+# events under videos_dir (watchdog when installed, else a polling rescan).
+# Events are collected by a background thread; the main thread takes whatever
+# has queued up since the last batch and transcribes it.
+FILE_DONE_PREFIX = "FILE_DONE:"
+WATCH_SETTLE_SECONDS = 2.0
+
+
+def is_media_path(path):
+    return path.lower().endswith(VIDEO_EXTENSIONS + AUDIO_EXTENSIONS)
+
+
+def wait_until_stable(paths, settle_seconds=WATCH_SETTLE_SECONDS):
+    """Waits until none of paths is still growing, checking them all together; returns
+    the ones that still exist, in order."""
+    last, pending, stable = {}, list(paths), set()
+    while pending:
+        sizes = {}
+        for path in pending:
+            try:
+                sizes[path] = os.path.getsize(path)
+            except OSError:
+                pass
+        stable.update(path for path, size in sizes.items() if last.get(path) == size)
+        pending = [path for path in sizes if path not in stable]
+        last = sizes
+        if pending:
+            time.sleep(settle_seconds)
+    return [path for path in paths if path in stable]
+
+
+def file_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime
+
+
+def read_stdin_events(events):
+    for line in sys.stdin:
+        line = line.strip()
+        path = line[len(FILE_DONE_PREFIX):] if line.startswith(FILE_DONE_PREFIX) else line
+        if path and is_media_path(path) and os.path.exists(path):
+            events.put(os.path.abspath(path))
+    events.put(None)  # scraper finished
+
+
+def watch_filesystem(events, videos_dir, poll_seconds):
+    """Starts reporting new media files under videos_dir; returns once they are watched."""
+    if WATCHDOG_AVAILABLE:
+        class MediaHandler(FileSystemEventHandler):
+            def on_created(self, event):
+                if not event.is_directory and is_media_path(event.src_path):
+                    events.put(os.path.abspath(event.src_path))
+
+            def on_moved(self, event):
+                # The scraper writes <id>.<ext>.part and renames it when complete
+                if not event.is_directory and is_media_path(event.dest_path):
+                    events.put(os.path.abspath(event.dest_path))
+
+        observer = Observer()
+        observer.schedule(MediaHandler(), videos_dir, recursive=True)
+        observer.start()
+        return
+
+    def poll(seen):
+        while True:
+            time.sleep(poll_seconds)
+            current = set(get_all_media_files(videos_dir))
+            for path in sorted(current - seen):
+                events.put(os.path.abspath(path))
+            seen = current
+
+    threading.Thread(target=poll, args=(set(get_all_media_files(videos_dir)),), daemon=True).start()
+
+
+def start_watch(videos_dir, stdin_events, poll_seconds):
+    """Starts collecting new files in the background and returns their queue. Call it
+    before the initial scan, so nothing that lands during that pass is missed."""
+    events = queue.Queue()
+    if stdin_events:
+        threading.Thread(target=read_stdin_events, args=(events,), daemon=True).start()
     else:
-        print("Non-English detected → translating to English...")
-        final_text = translate_to_english(audio_path)
-        output_file = os.path.join(transcription_folder, file_name + "_transcription_english.txt")
+        watch_filesystem(events, videos_dir, poll_seconds)
+        print(f"Watching {videos_dir} ({'watchdog' if WATCHDOG_AVAILABLE else f'polling every {poll_seconds:g}s'})")
+    return events
+
+
+def iter_watch_batches(events, settle=True, scanned=None):
+    """Yields lists of new, fully written media files until the event source ends.
+    settle=False trusts the paths to be complete (the scraper announces a file only
+    after its final rename); files in scanned ({path: signature}) that have not
+    changed since the initial pass are skipped."""
+    scanned = scanned or {}
+    done = False
+    while not done:
+        batch = [events.get()]
+        while True:
+            try:
+                batch.append(events.get_nowait())
+            except queue.Empty:
+                break
+        if None in batch:
+            done = True
+        paths = list(dict.fromkeys(p for p in batch if p))
+        if settle:
+            paths = wait_until_stable(paths)
+        paths = [p for p in paths if p not in scanned or file_signature(p) != scanned[p]]
+        if paths:
+            yield paths
+
+
+# -------------------------
+# MAIN PROCESSING
+# -------------------------
+def main():
+    print(base_dir)
+
+    try:
+        import tkinter  # noqa: F401
+    except ImportError:
+        print("tkinter missing. Install Python with Tk support.")
+        sys.exit(1)
+
+    parser = argparse.ArgumentParser(description="Transcribe (and translate) scraped videos")
+    parser.add_argument("videos_dir", nargs="?", default=os.path.join(base_dir, "data_files", "Database"))
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes, each with its own loaded model")
+    parser.add_argument("--torch_threads", type=int, default=0,
+                        help="torch threads per worker (0 = torch default)")
+    parser.add_argument("--manifest", default=os.path.join(base_dir, "transcription.db"),
+                        help="SQLite manifest used to skip already transcribed files")
+    parser.add_argument("--force", action="store_true", help="Re-transcribe files listed in the manifest")
+    parser.add_argument("--lang_detect", choices=["text", "audio"], default="text",
+                        help="text: transcribe, langdetect, re-run as translation; "
+                             "audio: detect from the first 30 s, then one full pass")
+    parser.add_argument("--no_audio", action="store_true",
+                        help="Only transcribe videos, not the voice notes / audio files under Audios")
+    parser.add_argument("--batch_size", type=int, default=16,
+                        help="Short voice notes packed per model call (1 = no batching)")
+    parser.add_argument("--backend", choices=BACKENDS, default="whisper",
+                        help="whisper (default), faster-whisper (int8 CPU), vosk, or auto per file. "
+                             "Batched voice notes and long-recording chunks use faster-whisper for "
+                             "faster-whisper/auto (when installed) and Whisper for vosk")
+    parser.add_argument("--vosk_model", default=VOSK_MODEL_PATH,
+                        help="Vosk model folder (default: VOSK_MODEL_PATH from .env)")
+    parser.add_argument("--long_seconds", type=float, default=1800,
+                        help="Recordings longer than this are VAD-segmented and chunked")
+    parser.add_argument("--chunk_seconds", type=float, default=120,
+                        help="Maximum length of one chunk of a long recording")
+    parser.add_argument("--chunk_workers", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="Worker processes transcribing chunks of a long recording")
+    parser.add_argument("--prefetch", type=int, default=2,
+                        help="Decoded files kept ready ahead of the model (0 = decode inline)")
+    parser.add_argument("--decoders", type=int, default=1,
+                        help="ffmpeg decoder threads feeding the model")
+    parser.add_argument("--watch", action="store_true",
+                        help="After the initial pass keep running and transcribe new files as they appear")
+    parser.add_argument("--stdin_events", action="store_true",
+                        help="Only transcribe files announced on stdin (FILE_DONE:<path> lines from the "
+                             "scraper); exits when stdin closes")
+    parser.add_argument("--poll_seconds", type=float, default=30,
+                        help="Rescan interval for --watch when watchdog is not installed")
+    parser.add_argument("--search", metavar="TEXT",
+                        help="Print transcript segments containing TEXT with their offsets, then exit")
+    parser.add_argument("--search_video", help="Limit --search to one media file")
+    parser.add_argument("--search_limit", type=int, default=50, help="Maximum --search hits")
+    parser.add_argument("--dedup", choices=["none", "hash", "audio"], default="hash",
+                        help="Transcribe forwarded copies once: hash (identical files) "
+                             "or audio (also re-encoded copies, by audio fingerprint)")
+    args = parser.parse_args()
+    if args.backend == "faster-whisper" and not FASTER_WHISPER_AVAILABLE:
+        print("faster-whisper is not installed (pip install faster-whisper).")
+        sys.exit(1)
+
+    videos_dir = args.videos_dir
+    transcription_folder = os.path.join(videos_dir, "Transcription")
+    os.makedirs(transcription_folder, exist_ok=True)
+
+    options = {
+        "transcription_folder": transcription_folder,
+        "videos_dir": videos_dir,
+        "vosk_model_path": args.vosk_model,
+        "lang_detect": args.lang_detect,
+        "backend": args.backend,
+        "long_seconds": args.long_seconds,
+        "chunk_seconds": args.chunk_seconds,
+    }
+
+    manifest = open_manifest(args.manifest)
+    if args.search:
+        hits = search_segments(manifest, args.search, video=args.search_video, limit=args.search_limit)
+        for hit in hits:
+            print(f"{hit['video']}  [{format_offset(hit['start'])}-{format_offset(hit['end'])}]  {hit['text']}")
+        print(f"{len(hits)} matching segments")
+        manifest.close()
+        return
+
+    def transcribe_files(video_files, workers):
+        if not args.force:
+            total = len(video_files)
+            video_files = [v for v in video_files if not is_already_transcribed(manifest, v)]
+            print(f"Skipping {total - len(video_files)} unchanged, already transcribed files.")
+        print(f"Found {len(video_files)} media files to process.\n")
+
+        video_files, duplicates, known, hashes = find_duplicates(manifest, video_files, args.dedup, reuse=not args.force)
+        for path, (source, output, language, model) in known.items():
+            output_file = copy_transcription(output, path, options)
+            record_transcription(manifest, {"video": path, "output": output_file, "language": language,
+                                            "model": model, "sha256": hashes.get(path)})
+            copy_segments(manifest, source, path)
+        copies = sum(len(d) for d in duplicates.values())
+        if known or copies:
+            print(f"{len(known)} files already transcribed under another name, "
+                  f"{copies} duplicates of files in this run; {len(video_files)} unique files left.")
+
+        def record(result):
+            result["sha256"] = hashes.get(result["video"])
+            record_transcription(manifest, result)
+            if not result.get("output"):
+                return
+            store_segments(manifest, result["video"], result.get("segments", []), result["language"])
+            for path in duplicates.get(result["video"], []):
+                output_file = copy_transcription(result["output"], path, options)
+                record_transcription(manifest, {"video": path, "output": output_file, "language": result["language"],
+                                                "model": result["model"], "sha256": hashes.get(path)})
+                store_segments(manifest, path, result.get("segments", []), result["language"])
+
+        # Long recordings first, each one spread across all chunk workers
+        long_files = [v for v in video_files if is_long_recording(v, args.long_seconds)]
+        if long_files:
+            print(f"{len(long_files)} long recordings, chunked across {args.chunk_workers} workers")
+            for result in run_long_recordings(long_files, options, args.chunk_workers, args.torch_threads):
+                record(result)
+        jobs = build_jobs([v for v in video_files if v not in long_files], args.batch_size)
+
+        if workers > 1:
+            print(f"Using {workers} worker processes")
+            for result in run_pool(jobs, options, workers, args.torch_threads):
+                print(f"Done: {result['video']} -> {result['output']}")
+                record(result)
+        elif args.prefetch > 0:
+            for result in run_pipelined(jobs, options, args.decoders, args.prefetch):
+                record(result)
+        else:
+            for job in jobs:
+                for result in process_job_safely(job, options):
+                    record(result)
+
+    if args.torch_threads and args.workers <= 1:
+        import torch
+        torch.set_num_threads(args.torch_threads)
+    events = None
+    if args.watch or args.stdin_events:
+        events = start_watch(videos_dir, args.stdin_events, args.poll_seconds)
+    scanned = {}
+    if not args.stdin_events:
+        video_files = get_all_video_files(videos_dir) if args.no_audio else get_all_media_files(videos_dir)
+        scanned = {os.path.abspath(v): file_signature(v) for v in video_files}
+        transcribe_files(video_files, args.workers)
+    if events is not None:
+        # Small batches as files arrive: keep the models resident in this process
+        # instead of starting a worker pool per batch
+        for paths in iter_watch_batches(events, settle=not args.stdin_events, scanned=scanned):
+            if args.no_audio:
+                paths = [p for p in paths if not is_audio_file(p)]
+            if paths:
+                transcribe_files(paths, 1)
 
-    # Save output
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write(format_transcription(final_text))
+    manifest.close()
+    release_models()
+    print("\nTranscription + Conditional English Translation complete!")
 
-    # Remove temp audio
-    if os.path.exists(audio_path):
-        os.remove(audio_path)
 
-print("\nTranscription + Conditional English Translation complete!")
+if __name__ == "__main__":
+    main()